@@ -1 +1,200 @@
 # Function will go in here for the entire site to use
+import re
+
+
+# ==================== MARKDOWN PARSING ====================
+# Single-pass Markdown -> block parser. It mirrors the notes exporter: the same block types,
+# two-space indentation for nested children, and the escapes written by escape_markdown_text.
+
+FENCE_PATTERN = re.compile(r'^(`{3,}|~{3,})\s*([^`\s]*)')
+HEADING_PATTERN = re.compile(r'^(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+SETEXT_PATTERN = re.compile(r'^(=+|-+)[ \t]*$')
+DIVIDER_PATTERN = re.compile(r'^([-*_])([ \t]*\1){2,}[ \t]*$')
+LIST_ITEM_PATTERN = re.compile(r'^([-*+]|\d{1,9}[.)])[ \t]+(\[[ xX]\][ \t]+)?(.*)$')
+EMPTY_LIST_ITEM_PATTERN = re.compile(r'^([-*+]|\d{1,9}[.)])$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+TABLE_CELL_SPLIT = re.compile(r'(?<!\\)\|')
+ESCAPED_PATTERN = re.compile(r'^\\[!-@\[-`{-~]')
+
+# Lines starting with anything else are always paragraph text
+BLOCK_START_CHARS = frozenset('#-*_+>\\0123456789')
+
+# Blocks that keep collecting the plain lines that directly follow them
+CONTINUABLE_TYPES = ('text', 'bullet', 'numbered', 'todo', 'quote')
+LIST_TYPES = ('bullet', 'numbered', 'todo')
+
+
+def markdown_block_separator(previous, block):
+    """Blank line the exporter puts between a list item and a following non-list block"""
+    return '\n' if previous.get('type') in LIST_TYPES and block.get('type') not in LIST_TYPES else ''
+
+
+def split_table_row(text):
+    """Cells of a Markdown table row, with the outer pipes and \\| escapes removed"""
+    text = text.strip()
+    if text.startswith('|'):
+        text = text[1:]
+    if text.endswith('|') and not text.endswith('\\|'):
+        text = text[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in TABLE_CELL_SPLIT.split(text)]
+
+
+def classify_markdown_line(text):
+    """Turn one stripped, non-blank line into a new block (paragraph text when nothing else matches)"""
+    if text[0] not in BLOCK_START_CHARS:
+        return {'type': 'text', 'content': text}
+
+    match = ESCAPED_PATTERN.match(text)
+    if match:
+        return {'type': 'text', 'content': text[1:]}
+
+    match = HEADING_PATTERN.match(text)
+    if match:
+        return {'type': f"heading{min(len(match.group(1)), 3)}", 'content': match.group(2) or ''}
+
+    if DIVIDER_PATTERN.match(text):
+        return {'type': 'divider', 'content': ''}
+
+    match = LIST_ITEM_PATTERN.match(text)
+    if match:
+        marker, checkbox, content = match.groups()
+        if checkbox:
+            return {'type': 'todo', 'content': content, 'checked': checkbox[1] in 'xX'}
+        return {'type': 'numbered' if marker[0].isdigit() else 'bullet', 'content': content}
+
+    match = EMPTY_LIST_ITEM_PATTERN.match(text)
+    if match:
+        return {'type': 'numbered' if text[0].isdigit() else 'bullet', 'content': ''}
+
+    if text.startswith('>'):
+        return {'type': 'quote', 'content': text[1:].removeprefix(' ')}
+
+    return {'type': 'text', 'content': text}
+
+
+def escape_markdown_text(content, skip_first=False):
+    """Backslash-escape lines that would otherwise be read back as a different block type"""
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        if i == 0 and skip_first:
+            continue
+        stripped = line.lstrip()
+        if stripped and (classify_markdown_line(stripped)['type'] != 'text'
+                         or stripped.startswith(('|', '```', '~~~'))
+                         or ESCAPED_PATTERN.match(stripped)
+                         or (i > 0 and SETEXT_PATTERN.match(stripped))):
+            lines[i] = f"{line[:len(line) - len(stripped)]}\\{stripped}"
+    return '\n'.join(lines)
+
+
+def parse_markdown_stream(lines):
+    """Yield top-level blocks from an iterable of Markdown lines, each as soon as it is complete
+
+    Indentation nests blocks under the block above them (the exporter writes children two
+    spaces deeper), so nested lists and indented code under list items keep their structure.
+    Plain lines directly below a list item continue it; a child paragraph follows a blank line.
+    Only the current top-level block is held in memory.
+    """
+    stack = []     # (indent, block) for the blocks that can still receive children
+    leaf = None    # (indent, block) still collecting lines: paragraph, list item, quote or table
+    fence = None   # open code fence: {'marker', 'indent', 'block', 'lines'}
+
+    def place(block, indent):
+        """Nest a block under the nearest shallower open block; returns a finished top-level block"""
+        finished = None
+        while stack and stack[-1][0] >= indent:
+            popped = stack.pop()
+            if not stack:
+                finished = popped[1]
+        if stack:
+            stack[-1][1].setdefault('children', []).append(block)
+        stack.append((indent, block))
+        return finished
+
+    for raw_line in lines:
+        line = raw_line.rstrip('\r\n').expandtabs(4)
+        text = line.strip()
+        indent = len(line) - len(line.lstrip(' '))
+
+        if fence:
+            if text.startswith(fence['marker']) and not text.strip(fence['marker'][0]):
+                fence['block']['content'] = '\n'.join(fence['lines'])
+                fence = None
+            else:
+                # Drop the fence's own indentation so code nested under list items round-trips
+                fence['lines'].append(line[min(indent, fence['indent']):])
+            continue
+
+        if not text:
+            leaf = None
+            continue
+
+        leaf_block = leaf[1] if leaf else None
+        leaf_type = leaf_block['type'] if leaf else None
+
+        if leaf_type == 'text' and '\n' not in leaf_block['content']:
+            # One-line paragraph followed by === / --- is a setext heading, or by |---| a table header
+            if leaf_block['content'].startswith('|') and TABLE_SEPARATOR_PATTERN.match(text):
+                leaf_block['type'] = 'table'
+                leaf_block['rows'] = [split_table_row(leaf_block.pop('content'))]
+                continue
+            match = SETEXT_PATTERN.match(text)
+            if match and indent <= leaf[0] + 3:
+                leaf_block['type'] = 'heading1' if match.group(1)[0] == '=' else 'heading2'
+                leaf = None
+                continue
+
+        if leaf_type == 'table' and text.startswith('|'):
+            leaf_block['rows'].append(split_table_row(text))
+            continue
+
+        match = FENCE_PATTERN.match(text)
+        if match:
+            block = {'type': 'code', 'language': match.group(2), 'content': ''}
+            fence = {'marker': match.group(1), 'indent': indent, 'block': block, 'lines': []}
+            leaf = None
+            finished = place(block, indent)
+            if finished:
+                yield finished
+            continue
+
+        block = classify_markdown_line(text)
+
+        if leaf_type == 'quote' and block['type'] == 'quote':
+            leaf_block['content'] += '\n' + block['content']
+            continue
+
+        # A plain line straight after a paragraph, list item or quote continues it
+        if block['type'] == 'text' and leaf_type in CONTINUABLE_TYPES:
+            leaf_block['content'] += '\n' + block['content']
+            continue
+
+        is_leaf = block['type'] in CONTINUABLE_TYPES
+        leaf = (indent, block) if is_leaf else None
+        finished = place(block, indent)
+        if finished:
+            yield finished
+
+    if fence:
+        fence['block']['content'] = '\n'.join(fence['lines'])
+    if stack:
+        yield stack[0][1]
+
+
+def parse_markdown(text):
+    """Parse a whole Markdown string into a list of blocks"""
+    return list(parse_markdown_stream(text.splitlines()))
+
+
+def parse_text_stream(lines):
+    """Yield one text block per blank-line separated paragraph of plain text"""
+    paragraph = []
+    for raw_line in lines:
+        line = raw_line.rstrip('\r\n')
+        if line.strip():
+            paragraph.append(line)
+        elif paragraph:
+            yield {'type': 'text', 'content': '\n'.join(paragraph)}
+            paragraph = []
+    if paragraph:
+        yield {'type': 'text', 'content': '\n'.join(paragraph)}
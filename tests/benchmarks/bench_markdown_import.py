@@ -0,0 +1,73 @@
+"""Benchmark the streaming Markdown import parser on a large synthetic document
+
+Run from the repository root: python tests/benchmarks/bench_markdown_import.py [sections]
+Prints the document size, block count, parse time and the parser's peak memory.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.functions import parse_markdown_stream  # noqa: E402
+
+
+SECTION = """## Section {i}
+
+Paragraph {i} with *some* inline text that runs on
+over a second line.
+
+- item one
+  - nested item with `code`
+- [x] finished task
+1) numbered
+
+```python
+def f{i}():
+    return {i}
+```
+
+> a quote
+
+| name | value |
+| --- | --- |
+| row {i} | a \\| b |
+
+---
+"""
+
+
+def synthetic_lines(sections):
+    """Yield the lines of a document made of repeated sections"""
+    for i in range(sections):
+        yield from SECTION.format(i=i).splitlines()
+
+
+def count_blocks(blocks):
+    return sum(1 + count_blocks(block.get('children') or []) for block in blocks)
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    size = sum(len(line) + 1 for line in synthetic_lines(sections))
+
+    start = time.perf_counter()
+    blocks = 0
+    for block in parse_markdown_stream(synthetic_lines(sections)):
+        blocks += count_blocks([block])
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a second pass since tracing slows the parser down
+    tracemalloc.start()
+    for block in parse_markdown_stream(synthetic_lines(sections)):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"document: {size / 1e6:.1f} MB, {blocks} blocks")
+    print(f"parse: {elapsed:.2f} s ({size / 1e6 / elapsed:.1f} MB/s), peak memory {peak / 1e3:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
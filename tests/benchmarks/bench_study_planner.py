@@ -0,0 +1,99 @@
+"""Benchmark the study planner on a term's worth of synthetic classes, assignments and events
+
+Run from the repository root: python tests/benchmarks/bench_study_planner.py [assignments]
+Prints planning time with and without saving, and checks that no study block overlaps a
+busy event or ends after its assignment's due date.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app import app  # noqa: E402
+from app.blueprints import notes  # noqa: E402
+
+
+TERM_START = datetime(2030, 1, 14, 8, 0)
+TERM_WEEKS = 15
+CLASSES = 10
+EVENTS = 200
+OWNER = 'bench-study-planner'
+TYPES = ['homework', 'quiz', 'exam', 'project', 'paper', 'lab', 'reading']
+DAY_SETS = [['monday', 'wednesday', 'friday'], ['tuesday', 'thursday']]
+
+
+def build_term(client, assignments):
+    """Classes with weekly meetings, assignments spread over the term and one-off busy events"""
+    rng = random.Random(42)
+    term_end = TERM_START + timedelta(weeks=TERM_WEEKS)
+    for i in range(CLASSES):
+        hour = 9 + i % 6
+        response = client.post('/notes/api/classes', json={
+            'name': f"Class {i}", 'code': f"C{i:03d}",
+            'schedule': {'days': DAY_SETS[i % 2], 'start_time': f"{hour:02d}:00", 'end_time': f"{hour:02d}:50",
+                         'start_date': TERM_START.date().isoformat(), 'end_date': term_end.date().isoformat()}
+        })
+        notes.create_class_schedule_events(notes.classes_store[response.get_json()['class']['id']])
+    classes = notes.get_partition('classes', OWNER)
+    for cls in classes.values():
+        due_dates = [TERM_START + timedelta(days=rng.randrange(7, TERM_WEEKS * 7), hours=rng.choice([9, 15]))
+                     for _ in range(assignments // CLASSES)]
+        notes.upsert_assignments(cls, [{'title': f"{cls['code']} #{n}", 'type': rng.choice(TYPES),
+                                        'due_date': due.isoformat(timespec='minutes')}
+                                       for n, due in enumerate(due_dates)])
+    events = []
+    for i in range(EVENTS):
+        start = TERM_START + timedelta(days=rng.randrange(TERM_WEEKS * 7), hours=rng.randrange(1, 12))
+        events.append({'id': f"{OWNER}-busy{i}", 'title': f"Busy {i}", 'start': start.isoformat(),
+                       'end': (start + timedelta(minutes=rng.choice([30, 60, 120]))).isoformat()})
+    notes.store_events(events, OWNER)
+
+
+def check_plan(blocks):
+    """Count blocks that overlap a busy event or end after their assignment is due"""
+    busy = notes.merge_intervals(notes.event_intervals(
+        [event for event in notes.query_events(owner_id=OWNER) if event.get('type') != 'study']))
+    due = {assignment['id']: datetime.fromisoformat(notes.assignment_due_key(assignment))
+           for cls in notes.get_partition('classes', OWNER).values() for assignment in cls['assignments']}
+    overlaps = late = 0
+    for block in blocks:
+        start, end = datetime.fromisoformat(block['start']), datetime.fromisoformat(block['end'])
+        overlaps += any(b_start < end and start < b_end for b_start, b_end in busy)
+        late += end > due[block['assignment_id']]
+    return overlaps, late
+
+
+def main():
+    assignments = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    data = {'start': TERM_START.isoformat()}
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = OWNER
+    with app.test_request_context():
+        notes.session['user_id'] = OWNER
+        build_term(client, assignments)
+
+        started = time.perf_counter()
+        preview, unscheduled, timings = notes.plan_study_sessions(data, save=False)
+        dry_run = time.perf_counter() - started
+
+        started = time.perf_counter()
+        saved, _, _ = notes.plan_study_sessions(data)
+        with_save = time.perf_counter() - started
+
+        overlaps, late = check_plan(preview)
+
+    print(f"term: {CLASSES} classes over {TERM_WEEKS} weeks, {assignments} assignments, {EVENTS} other events")
+    print(f"plan: {len(preview)} blocks, {len(unscheduled)} assignments short of time")
+    print(f"planning: {timings['planning_ms']:.1f} ms (dry run {dry_run * 1000:.1f} ms, "
+          f"saving {len(saved)} events {with_save * 1000:.1f} ms)")
+    print(f"check: {overlaps} blocks overlap busy time, {late} end after their due date")
+    if overlaps or late:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Shared fixtures for the notes blueprint tests
+
+The notes stores are module-level dicts, so each test logs in as its own user
+and only ever sees its own partition.
+"""
+import pytest
+
+from app import app as flask_app
+from app.blueprints import notes
+
+
+@pytest.fixture
+def user_id(request):
+    """Owner id unique to the running test"""
+    return f"user-{request.node.name}"
+
+
+@pytest.fixture
+def client(user_id):
+    """Test client logged in as the test's user"""
+    flask_app.config['TESTING'] = True
+    client = flask_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return client
+
+
+@pytest.fixture
+def as_user(user_id):
+    """Request context logged in as the test's user, for calling blueprint functions directly"""
+    with flask_app.test_request_context():
+        notes.session['user_id'] = user_id
+        yield user_id
+
+
+@pytest.fixture
+def new_class(client):
+    """Factory that creates a class through the API and returns the stored class"""
+    def create(**fields):
+        response = client.post('/notes/api/classes', json={'name': 'Biology', 'code': 'BIO 101', **fields})
+        return notes.classes_store[response.get_json()['class']['id']]
+    return create
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    """Keep AI features on their local fallbacks"""
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
@@ -0,0 +1,61 @@
+"""Grouped aggregations and relation rollups over database rows"""
+import numpy as np
+
+from app.blueprints import notes
+
+
+def make_db(user_id, db_id, properties, rows):
+    db = {'id': db_id, 'name': db_id, 'properties': properties}
+    notes.databases_store[db_id] = db
+    notes.add_to_partition('databases', db, user_id)
+    notes.append_table_rows(db, notes.get_row_table(db), rows)
+    return db
+
+
+def test_aggregate_kernel_ignores_nan():
+    values = np.array([1.0, np.nan, 3.0, 4.0])
+    groups = np.array([0, 0, 1, 1])
+    assert notes.aggregate_kernel('sum', values, groups, 2).tolist() == [1.0, 7.0]
+    assert notes.aggregate_kernel('avg', values, groups, 2).tolist() == [1.0, 3.5]
+    assert notes.aggregate_kernel('count_empty', values, groups, 2).tolist() == [1.0, 0.0]
+    assert notes.aggregate_kernel('max', values, groups, 2).tolist() == [1.0, 4.0]
+    weighted = notes.aggregate_kernel('weighted_avg', values, groups, 2, np.array([1.0, 1.0, 1.0, 3.0]))
+    assert weighted.tolist() == [1.0, 3.75]
+
+
+def test_group_by_select_keeps_empty_options(user_id):
+    db = make_db(user_id, f"agg-{user_id}", [
+        {'id': 'status', 'type': 'select', 'options': [{'id': 'a', 'name': 'A'}, {'id': 'b', 'name': 'B'}, {'id': 'c', 'name': 'C'}]},
+        {'id': 'points', 'type': 'number'}
+    ], [{'status': 'a', 'points': 2}, {'status': 'a', 'points': 4}, {'status': 'b'}, {'points': 10}])
+
+    result = notes.aggregate_database(db, {
+        'group_by': 'status',
+        'aggregations': [{'function': 'avg', 'property': 'points', 'as': 'avg'}, {'function': 'count'}]
+    })
+    assert [(g['label'], g['count'], g['values']['avg']) for g in result['groups']] == [
+        ('A', 2, 3.0), ('B', 1, None), ('C', 0, None), ('No status', 1, 10.0)]
+    assert result['totals']['avg'] == 16 / 3
+
+
+def test_rollup_through_relation_and_cache_invalidation(user_id):
+    tasks = make_db(user_id, f"tasks-{user_id}", [{'id': 'hours', 'type': 'number'}],
+                    [{'hours': 1}, {'hours': 2}, {'hours': 5}])
+    task_ids = notes.get_row_table(tasks)['ids']
+    projects = make_db(user_id, f"projects-{user_id}", [
+        {'id': 'name', 'type': 'text'},
+        {'id': 'tasks', 'type': 'relation', 'database_id': tasks['id']}
+    ], [{'name': 'x', 'tasks': task_ids[:2]}, {'name': 'y', 'tasks': task_ids[2:]}])
+
+    spec = {'group_by': 'name', 'aggregations': [{'function': 'sum', 'relation': 'tasks', 'property': 'hours', 'as': 'hours'}]}
+    assert [g['values']['hours'] for g in notes.aggregate_database(projects, spec)['groups']] == [3.0, 5.0]
+
+    table = notes.get_row_table(tasks)
+    notes.set_row_properties(tasks, table, 0, {'hours': 11})
+    assert [g['values']['hours'] for g in notes.aggregate_database(projects, spec)['groups']] == [13.0, 5.0]
+
+
+def test_aggregate_route_rejects_bad_specs(client, user_id):
+    db = make_db(user_id, f"bad-{user_id}", [{'id': 'due', 'type': 'date'}], [{'due': '2026-01-01'}])
+    response = client.post(f"/notes/api/database/{db['id']}/aggregate", json={'aggregations': [{'function': 'sum', 'property': 'due'}]})
+    assert response.status_code == 400
@@ -0,0 +1,50 @@
+"""Cross-class assignment index ordered by due date"""
+from app.blueprints import notes
+
+
+def add_assignments(client, cls, *due_dates):
+    assignments = [{'title': f"{cls['code']} #{i}", 'due_date': due} for i, due in enumerate(due_dates)]
+    client.post(f"/notes/api/classes/{cls['id']}/assignments/bulk", json={'assignments': assignments})
+    return cls['assignments']
+
+
+def upcoming(client, **args):
+    query = '&'.join(f"{key}={value}" for key, value in args.items())
+    return client.get(f"/notes/api/assignments/upcoming?{query}").get_json()
+
+
+def test_merges_classes_in_due_order_with_cursor_pages(client, new_class):
+    bio = new_class(code='BIO')
+    chem = new_class(code='CHEM')
+    add_assignments(client, bio, '2026-09-01T10:00', '2026-09-03', '2026-09-20')
+    add_assignments(client, chem, '2026-09-02T09:00', '2026-09-03T12:00')
+
+    first = upcoming(client, start='2026-09-01', end='2026-09-10', limit=3)
+    assert [a['title'] for a in first['assignments']] == ['BIO #0', 'CHEM #0', 'CHEM #1']
+    assert first['has_more']
+
+    rest = upcoming(client, start='2026-09-01', end='2026-09-10', limit=3, cursor=first['next_cursor'])
+    # A date-only due date counts as the end of that day
+    assert [a['title'] for a in rest['assignments']] == ['BIO #1']
+    assert not rest['has_more']
+
+    assert [a['title'] for a in upcoming(client, start='2026-09-01', days=30, class_id=bio['id'])['assignments']] == [
+        'BIO #0', 'BIO #1', 'BIO #2']
+
+
+def test_completion_and_due_date_changes_reindex(client, new_class, user_id):
+    cls = new_class(code='MATH')
+    first, second = add_assignments(client, cls, '2026-10-01T10:00', '2026-10-02T10:00')
+
+    client.put(f"/notes/api/classes/{cls['id']}/assignments/{first['id']}", json={'completed': True})
+    client.put(f"/notes/api/classes/{cls['id']}/assignments/{second['id']}", json={'due_date': '2026-10-20T10:00'})
+
+    assert upcoming(client, start='2026-10-01', days=7)['assignments'] == []
+    assert [a['id'] for a in upcoming(client, start='2026-10-01', days=7, status='completed')['assignments']] == [first['id']]
+    assert [a['id'] for a in upcoming(client, start='2026-10-01', days=30)['assignments']] == [second['id']]
+    assert notes.count_assignments_due('2026-10-01', '2026-10-31', owner_id=user_id) == 1
+
+
+def test_invalid_arguments(client):
+    assert client.get('/notes/api/assignments/upcoming?status=late').status_code == 400
+    assert client.get('/notes/api/assignments/upcoming?start=soon').status_code == 400
@@ -0,0 +1,94 @@
+"""Idempotent bulk upsert of assignments and their calendar events"""
+from app.blueprints import notes
+
+
+ASSIGNMENTS = [
+    {'title': 'Lab report 1', 'due_date': '2026-02-10T23:59', 'type': 'lab', 'points': 50},
+    {'title': 'Midterm', 'due_date': '2026-03-05T10:00', 'type': 'exam', 'points': 200},
+    {'title': 'Reading', 'type': 'homework'}
+]
+
+
+def assignment_events(cls):
+    return notes.query_events(class_id=cls['id'], event_type='assignment', owner_id=cls['owner_id'])
+
+
+def bulk(client, cls, assignments):
+    response = client.post(f"/notes/api/classes/{cls['id']}/assignments/bulk", json={'assignments': assignments})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_reimporting_the_same_assignments_changes_nothing(client, new_class):
+    cls = new_class()
+    first = bulk(client, cls, ASSIGNMENTS)
+    assert len(first['created']) == 3
+    events = assignment_events(cls)
+    assert len(events) == 2
+
+    second = bulk(client, cls, ASSIGNMENTS)
+    assert second['created'] == [] and second['updated'] == [] and second['unchanged'] == 3
+    assert assignment_events(cls) == events
+    assert len(cls['assignments']) == 3
+
+
+def test_updates_move_the_existing_event(client, new_class):
+    cls = new_class()
+    bulk(client, cls, ASSIGNMENTS[:1])
+    result = bulk(client, cls, [{'title': 'lab report 1', 'due_date': '2026-02-10T23:59', 'description': 'Cells'}])
+    assert [a['description'] for a in result['updated']] == ['Cells']
+
+    events = assignment_events(cls)
+    assert len(events) == 1 and events[0]['description'].endswith('Cells')
+    assert notes.query_events('2026-02-10', '2026-02-10', class_id=cls['id'], owner_id=cls['owner_id']) == events
+
+
+def test_updating_an_undated_assignment(client, new_class):
+    cls = new_class()
+    bulk(client, cls, [{'title': 'Read'}])
+    result = bulk(client, cls, [{'title': 'Read', 'points': 5}])
+    assert [a['points'] for a in result['updated']] == [5]
+    assert assignment_events(cls) == []
+
+
+def test_bulk_rejects_non_objects(client, new_class):
+    cls = new_class()
+    response = client.post(f"/notes/api/classes/{cls['id']}/assignments/bulk", json={'assignments': ['x']})
+    assert response.status_code == 400
+
+
+def test_moved_due_date_matches_on_title(client, new_class):
+    cls = new_class()
+    bulk(client, cls, ASSIGNMENTS)
+    result = bulk(client, cls, [{'title': 'Midterm', 'due_date': '2026-03-12T10:00'}])
+    assert [a['due_date'] for a in result['updated']] == ['2026-03-12T10:00'] and result['created'] == []
+    assert len(cls['assignments']) == 3
+
+    events = assignment_events(cls)
+    assert sorted(event['start'] for event in events) == ['2026-02-10T23:59', '2026-03-12T10:00']
+    page, _ = notes.query_assignments('2026-03-01', '2026-04-01', class_id=cls['id'], owner_id=cls['owner_id'])
+    assert [assignment['due_date'] for assignment, _ in page] == ['2026-03-12T10:00']
+    assert notes.query_assignments('2026-03-05', '2026-03-06', class_id=cls['id'], owner_id=cls['owner_id'])[0] == []
+
+
+def test_repeated_titles_are_not_matched_on_title_alone(client, new_class):
+    cls = new_class()
+    quizzes = [{'title': 'Quiz', 'due_date': '2026-02-02T10:00'}, {'title': 'Quiz', 'due_date': '2026-02-09T10:00'}]
+    assert len(bulk(client, cls, quizzes)['created']) == 2
+
+    result = bulk(client, cls, [{'title': 'Quiz', 'due_date': '2026-02-16T10:00'}])
+    assert len(result['created']) == 1 and result['updated'] == []
+    assert len(assignment_events(cls)) == 3
+
+
+def test_batch_indexes_in_due_order_and_drops_the_grade_book(client, new_class):
+    cls = new_class()
+    client.get(f"/notes/api/classes/{cls['id']}/grades")
+    assert cls['id'] in notes.grade_books
+
+    due_dates = ['2026-04-01T09:00', '2026-02-01T09:00', '2026-03-01T09:00']
+    bulk(client, cls, [{'title': f"HW {i}", 'due_date': due} for i, due in enumerate(due_dates)])
+    assert cls['id'] not in notes.grade_books
+    page, _ = notes.query_assignments(class_id=cls['id'], owner_id=cls['owner_id'])
+    assert [assignment['title'] for assignment, _ in page] == ['HW 1', 'HW 2', 'HW 0']
+    assert notes.find_assignment(cls, page[0][0]['id']) is page[0][0]
@@ -0,0 +1,57 @@
+"""Free/busy merging, conflict sweeps and conflict checks"""
+from datetime import datetime, timedelta, time
+
+from app.blueprints import notes
+
+
+def add_event(owner_id, event_id, start, end, **fields):
+    return notes.store_event({'id': f"{owner_id}-{event_id}", 'title': event_id, 'start': start, 'end': end, **fields}, owner_id)
+
+
+def test_merge_and_free_slots():
+    day = datetime(2026, 4, 6)
+    intervals = notes.event_intervals([
+        {'id': 'a', 'start': '2026-04-06T09:00:00', 'end': '2026-04-06T10:00:00'},
+        {'id': 'b', 'start': '2026-04-06T09:30:00', 'end': '2026-04-06T11:00:00'},
+        {'id': 'c', 'start': '2026-04-06T13:00:00', 'end': '2026-04-06T13:15:00'},
+        {'id': 'd', 'start': '2026-04-06', 'end': '2026-04-06', 'all_day': True}
+    ])
+    busy = notes.merge_intervals(intervals)
+    assert busy == [[day.replace(hour=9), day.replace(hour=11)], [day.replace(hour=13), day.replace(hour=13, minute=15)]]
+
+    free = notes.free_slots(busy, day, day + timedelta(days=1), timedelta(minutes=30), time(8), time(14))
+    assert free == [(day.replace(hour=8), day.replace(hour=9)), (day.replace(hour=11), day.replace(hour=13)),
+                    (day.replace(hour=13, minute=15), day.replace(hour=14))]
+
+
+def test_sweep_finds_each_overlapping_pair():
+    intervals = notes.event_intervals([
+        {'id': 'long', 'start': '2026-04-06T08:00:00', 'end': '2026-04-06T12:00:00'},
+        {'id': 'x', 'start': '2026-04-06T09:00:00', 'end': '2026-04-06T09:30:00'},
+        {'id': 'y', 'start': '2026-04-06T11:00:00', 'end': '2026-04-06T13:00:00'},
+        {'id': 'after', 'start': '2026-04-06T13:00:00', 'end': '2026-04-06T14:00:00'}
+    ])
+    pairs = {tuple(sorted((a['id'], b['id']))) for a, b, _, _ in notes.sweep_overlaps(intervals)}
+    assert pairs == {('long', 'x'), ('long', 'y')}
+
+
+def test_check_reports_conflicts_with_recurring_classes(client, user_id):
+    add_event(user_id, 'lecture', '2026-04-06T10:00:00', '2026-04-06T11:00:00',
+              recurrence=notes.normalize_recurrence({'frequency': 'weekly', 'count': 10}))
+
+    response = client.post('/notes/api/calendar/conflicts/check',
+                           json={'start': '2026-04-20T10:30:00', 'end': '2026-04-20T11:30:00'})
+    conflicts = response.get_json()['conflicts']
+    assert [c['conflicts_with']['title'] for c in conflicts] == ['lecture']
+    assert (conflicts[0]['overlap_start'], conflicts[0]['overlap_end']) == ('2026-04-20T10:30:00', '2026-04-20T11:00:00')
+
+    response = client.post('/notes/api/calendar/conflicts/check',
+                           json={'start': '2026-04-20T11:00:00', 'end': '2026-04-20T12:00:00'})
+    assert response.get_json()['conflicts'] == []
+
+
+def test_check_rejects_malformed_schedules(client):
+    for schedule in ({'days': [1]}, {'days': [None, 'monday']}, ['monday']):
+        response = client.post('/notes/api/calendar/conflicts/check', json={'name': 'X', 'schedule': schedule})
+        assert response.status_code == 400
+    assert client.post('/notes/api/calendar/conflicts/check', json={'end': '2026-04-20'}).status_code == 400
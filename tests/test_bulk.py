@@ -0,0 +1,80 @@
+"""Bulk page and database row operations"""
+from app.blueprints import notes
+
+
+def make_pages(owner_id, *names):
+    pages = []
+    for name in names:
+        page = {'id': f"{owner_id}-{name}", 'title': name, 'blocks': []}
+        notes.pages_store[page['id']] = page
+        pages.append(notes.add_to_partition('pages', page, owner_id))
+    return pages
+
+
+def make_database(owner_id, *names):
+    db = {'id': f"db-{owner_id}", 'name': 'Reading', 'properties': [{'id': 'name', 'name': 'Name', 'type': 'text'}]}
+    notes.databases_store[db['id']] = db
+    notes.add_to_partition('databases', db, owner_id)
+    notes.append_table_rows(db, notes.get_row_table(db), [{'name': name} for name in names])
+    return db
+
+
+def row_names(db):
+    table = notes.get_row_table(db)
+    return [notes.materialize_row(table, pos)['properties']['name'] for pos in notes.live_positions(table)]
+
+
+def test_page_operations_report_each_item(client, user_id):
+    a, b, c = make_pages(user_id, 'a', 'b', 'c')
+    folder = client.post('/notes/api/folders', json={'name': 'Folder'}).get_json()['folder']['id']
+
+    response = client.post('/notes/api/pages/bulk', json={'operations': [
+        {'op': 'move', 'page_id': a['id'], 'folder_id': folder},
+        {'op': 'favorite', 'page_id': b['id']},
+        {'op': 'delete', 'page_id': c['id']},
+        {'op': 'favorite', 'page_id': c['id']},
+        {'op': 'move', 'page_id': b['id'], 'folder_id': 'folder-missing'},
+        {'op': 'rename', 'page_id': a['id']},
+        {'op': 'restore', 'page_id': a['id']}
+    ]}).get_json()
+
+    assert not response['success']
+    assert [r.get('error') for r in response['results']] == [
+        None, None, None, 'Page not found', 'Folder not found', 'Unknown operation: rename', 'Page not in trash']
+    assert a['folder_id'] == folder and b['is_favorite'] and c['is_deleted']
+
+    restored = client.post('/notes/api/pages/bulk', json={'operations': [{'op': 'restore', 'page_id': c['id']}]})
+    assert restored.get_json()['success'] and not c['is_deleted']
+
+
+def test_row_operations_report_each_item(client, user_id):
+    db = make_database(user_id, 'Algebra', 'Cells', 'Genetics')
+    table = notes.get_row_table(db)
+    algebra, cells = table['ids'][:2]
+
+    response = client.post(f"/notes/api/database/{db['id']}/rows/batch", json={'operations': [
+        {'op': 'update', 'row_id': algebra, 'properties': {'name': 'Calculus'}},
+        {'op': 'delete', 'row_id': cells},
+        {'op': 'insert', 'properties': {'name': 'Ecology'}},
+        {'op': 'update', 'row_id': 'r-missing', 'properties': {'name': 'X'}},
+        {'op': 'merge', 'row_id': algebra}
+    ]}).get_json()
+
+    assert [r.get('error') for r in response['results']] == [None, None, None, 'Row not found', 'Unknown operation: merge']
+    assert response['results'][2]['row_id'] in table['positions']
+    assert row_names(db) == ['Calculus', 'Genetics', 'Ecology']
+
+
+def test_malformed_and_oversized_requests_are_rejected(client, user_id, monkeypatch):
+    page, = make_pages(user_id, 'a')
+    db = make_database(user_id, 'Algebra')
+    monkeypatch.setattr(notes, 'MAX_BULK_OPERATIONS', 2)
+
+    for url in ('/notes/api/pages/bulk', f"/notes/api/database/{db['id']}/rows/batch"):
+        for operations in (['x'], {'op': 'delete'}, [{'op': 'delete'}, 3]):
+            assert client.post(url, json={'operations': operations}).status_code == 400
+        too_many = [{'op': 'favorite', 'page_id': page['id']}] * 3
+        assert client.post(url, json={'operations': too_many}).status_code == 400
+    assert client.post(f"/notes/api/database/{db['id']}/rows/batch",
+                       json={'operations': [{'op': 'insert', 'properties': ['x']}]}).status_code == 400
+    assert not page.get('is_favorite') and row_names(db) == ['Algebra']
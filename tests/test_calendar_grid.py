@@ -0,0 +1,74 @@
+"""Cached month and week calendar grids"""
+from datetime import date
+
+from app.blueprints import notes
+
+# The March 2030 month grid runs from Sunday 24 February to Saturday 6 April
+MARCH = notes.calendar_range('month', date(2030, 3, 15))
+
+
+def grid(client, view='month', day='2030-03-15'):
+    return client.get(f"/notes/api/calendar/grid?view={view}&date={day}").get_json()['grid']
+
+
+def cached(user_id):
+    return set(notes.calendar_grid_cache.get(user_id, {}))
+
+
+def create(client, title, start, end=None):
+    return client.post('/notes/api/calendar/events', json={'title': title, 'start': start, 'end': end}).get_json()['event']
+
+
+def test_grid_buckets_events_by_day(client):
+    create(client, 'Lecture', '2030-03-04T09:00:00', '2030-03-04T10:00:00')
+    create(client, 'Retreat', '2030-02-22', '2030-02-25T12:00:00')
+
+    month = grid(client)
+    assert (month['start'], month['end']) == ('2030-02-24', '2030-04-06') and len(month['days']) == 42
+    titles = {day['date']: [event['title'] for event in day['events']] for day in month['days']}
+    assert titles['2030-02-24'] == titles['2030-02-25'] == ['Retreat']
+    assert titles['2030-03-04'] == ['Lecture'] and titles['2030-03-05'] == []
+    assert month['event_count'] == 2
+
+
+def test_changes_inside_the_range_drop_the_cached_grid(client, user_id):
+    grid(client)
+    assert cached(user_id) == {MARCH}
+
+    event = create(client, 'Exam', '2030-03-12T09:00:00')
+    assert cached(user_id) == set()
+    assert [e['title'] for day in grid(client)['days'] for e in day['events']] == ['Exam']
+
+    client.put(f"/notes/api/calendar/events/{event['id']}", json={'start': '2030-05-20T09:00:00'})
+    assert cached(user_id) == set()
+    assert grid(client)['event_count'] == 0
+
+    # Moving an event into the range from outside it drops the grid too
+    client.put(f"/notes/api/calendar/events/{event['id']}", json={'start': '2030-03-20T09:00:00'})
+    assert cached(user_id) == set()
+    assert grid(client)['event_count'] == 1
+
+    client.delete(f"/notes/api/calendar/events/{event['id']}")
+    assert cached(user_id) == set()
+    assert grid(client)['event_count'] == 0
+
+
+def test_changes_outside_the_range_keep_the_cached_grid(client, user_id):
+    grid(client)
+    week = notes.calendar_range('week', date(2030, 3, 13))
+    grid(client, 'week', '2030-03-13')
+    assert cached(user_id) == {MARCH, week}
+
+    event = create(client, 'Summer job', '2030-06-03T09:00:00')
+    client.put(f"/notes/api/calendar/events/{event['id']}", json={'start': '2030-06-10T09:00:00'})
+    client.delete(f"/notes/api/calendar/events/{event['id']}")
+    assert cached(user_id) == {MARCH, week}
+
+    # An event in the month but outside the week only drops the month grid
+    create(client, 'Quiz', '2030-03-27T09:00:00')
+    assert cached(user_id) == {week}
+
+
+def test_rejects_bad_view_and_date(client):
+    assert client.get('/notes/api/calendar/grid?view=year').status_code == 400
+    assert client.get('/notes/api/calendar/grid?date=someday').status_code == 400
@@ -0,0 +1,139 @@
+"""Columnar row storage, secondary indexes and the database query engine"""
+import pytest
+
+from app.blueprints import notes
+
+
+PROPERTIES = [
+    {'id': 'name', 'name': 'Name', 'type': 'text'},
+    {'id': 'pages', 'name': 'Pages', 'type': 'number'},
+    {'id': 'due', 'name': 'Due', 'type': 'date'},
+    {'id': 'done', 'name': 'Done', 'type': 'checkbox'},
+    {'id': 'status', 'name': 'Status', 'type': 'select',
+     'options': [{'id': 'todo', 'name': 'To do'}, {'id': 'doing', 'name': 'Doing'}, {'id': 'done', 'name': 'Done'}]},
+    {'id': 'tags', 'name': 'Tags', 'type': 'multi_select',
+     'options': [{'id': 'math', 'name': 'Math'}, {'id': 'bio', 'name': 'Biology'}]}
+]
+
+ROWS = [
+    {'name': 'Algebra', 'pages': 12, 'due': '2026-03-01', 'done': True, 'status': 'done', 'tags': ['math']},
+    {'name': 'Cells', 'pages': 30, 'due': '2026-03-05T09:00:00', 'status': 'doing', 'tags': ['bio']},
+    {'name': 'Genetics', 'pages': 8, 'status': 'todo', 'tags': ['bio', 'math']},
+    {'name': 'algebra', 'due': '2026-02-20'}
+]
+
+
+@pytest.fixture
+def db(user_id):
+    """A database with a few typed rows owned by the test's user"""
+    db = {'id': f"db-{user_id}", 'name': 'Study', 'properties': [dict(prop) for prop in PROPERTIES]}
+    notes.databases_store[db['id']] = db
+    notes.add_to_partition('databases', db, user_id)
+    table = notes.get_row_table(db)
+    notes.append_table_rows(db, table, [dict(row) for row in ROWS])
+    return db
+
+
+def names(db, query):
+    return [row['properties'].get('name') for row in notes.query_database(db, query)['results']]
+
+
+def test_cells_read_back_as_written(db):
+    table = notes.get_row_table(db)
+    row = notes.materialize_row(table, 1)
+    assert row['properties'] == {'name': 'Cells', 'pages': 30, 'due': '2026-03-05T09:00:00',
+                                 'done': False, 'status': 'doing', 'tags': ['bio']}
+
+
+def test_filters_sorts_and_pagination(db):
+    assert names(db, {'filters': {'property': 'pages', 'operator': 'greater_than', 'value': 10}}) == ['Algebra', 'Cells']
+    assert names(db, {'filters': {'property': 'due', 'operator': 'on_or_before', 'value': '2026-03-01'}}) == ['Algebra', 'algebra']
+    assert names(db, {'filters': {'property': 'status', 'operator': 'equals', 'value': 'To do'}}) == ['Genetics']
+    assert names(db, {'filters': {'or': [{'property': 'done', 'operator': 'equals', 'value': True},
+                                         {'property': 'pages', 'operator': 'is_empty'}]}}) == ['Algebra', 'algebra']
+    assert names(db, {'sorts': [{'property': 'pages', 'direction': 'descending'}]}) == ['Cells', 'Algebra', 'Genetics', 'algebra']
+
+    page = notes.query_database(db, {'sorts': [{'property': 'status'}], 'limit': 2})
+    assert [r['properties']['name'] for r in page['results']] == ['Genetics', 'Cells']
+    assert page['next_cursor'] == 2 and page['total'] == 4
+
+
+def test_invalid_filters_raise_value_error(db):
+    with pytest.raises(ValueError):
+        notes.query_database(db, {'filters': {'property': 'missing'}})
+    with pytest.raises(ValueError):
+        notes.query_database(db, {'filters': {'property': 'pages', 'operator': 'resembles'}})
+
+
+@pytest.mark.parametrize('condition', [
+    {'property': 'tags', 'operator': 'contains', 'value': 'Math'},
+    {'property': 'tags', 'operator': 'equals', 'value': ['bio', 'math']},
+    {'property': 'tags', 'operator': 'equals', 'value': 'math'},
+    {'property': 'tags', 'operator': 'in', 'value': ['bio']},
+    {'property': 'name', 'operator': 'equals', 'value': 'ALGEBRA'},
+    {'property': 'name', 'operator': 'in', 'value': ['cells', 'genetics']},
+    {'property': 'name', 'operator': 'contains', 'value': 'gen'}
+])
+def test_indexed_and_scanned_filters_agree(db, condition):
+    scanned = names(db, {'filters': condition})
+    table = notes.get_row_table(db)
+    notes.build_secondary_index(table, condition['property'])
+    assert names(db, {'filters': condition}) == scanned
+
+
+def test_multi_select_contains_matches_tag_membership(db):
+    notes.build_secondary_index(notes.get_row_table(db), 'tags')
+    assert names(db, {'filters': {'property': 'tags', 'operator': 'contains', 'value': 'math'}}) == ['Algebra', 'Genetics']
+
+
+def test_deletes_tombstone_and_compact(db):
+    table = notes.get_row_table(db)
+    notes.build_secondary_index(table, 'name')
+    first_id = table['ids'][0]
+    assert notes.delete_table_row(table, first_id)
+    assert names(db, {}) == ['Cells', 'Genetics', 'algebra']
+
+    notes.compact_table(table)
+    assert table['size'] == 3 and first_id not in table['positions']
+    assert names(db, {'filters': {'property': 'name', 'operator': 'equals', 'value': 'algebra'}}) == ['algebra']
+
+
+def assert_aligned(table):
+    """Every column matches the table's size and capacity and positions match the ids"""
+    for column in table['columns'].values():
+        if isinstance(column['values'], list):
+            assert len(column['values']) == table['size']
+        else:
+            assert len(column['values']) == table['capacity']
+        if column['type'] == 'date':
+            assert len(column['raw']) == table['size']
+    assert len(table['alive']) == table['capacity'] and len(table['ids']) == table['size']
+    assert all(table['ids'][pos] == row_id for row_id, pos in table['positions'].items())
+    assert table['alive'][:table['size']].sum() == len(table['positions'])
+
+
+def test_inserts_updates_and_deletes_keep_columns_aligned(db, monkeypatch):
+    table = notes.get_row_table(db)
+    notes.build_secondary_index(table, 'status')
+    positions = notes.append_table_rows(db, table, [{'name': f"Row {i}", 'pages': i, 'status': 'todo'} for i in range(100)])
+    assert table['capacity'] >= table['size'] == 104
+    assert_aligned(table)
+
+    version = table['version']
+    target = table['ids'][positions[10]]
+    notes.set_row_properties(db, table, positions[10], {'pages': 'many', 'due': '2026-05-01', 'status': 'done'})
+    assert table['version'] > version
+    assert notes.materialize_row(table, positions[10]) == {
+        'id': target, 'properties': {'name': 'Row 10', 'due': '2026-05-01', 'done': False, 'status': 'done'}}
+    assert_aligned(table)
+
+    monkeypatch.setattr(notes, 'MIN_DELETED_BEFORE_COMPACT', 10)
+    for row_id in [table['ids'][pos] for pos in positions[:60]]:
+        if row_id != target:
+            notes.delete_table_row(table, row_id)
+    # Compacted when the 52nd delete left half the table tombstoned; later deletes are tombstones again
+    assert (table['size'], table['deleted'], len(table['positions'])) == (52, 7, 45)
+    assert_aligned(table)
+    assert notes.materialize_row(table, table['positions'][target])['properties']['status'] == 'done'
+    assert names(db, {'filters': {'property': 'status', 'operator': 'equals', 'value': 'done'}}) == ['Algebra', 'Row 10']
+    assert not notes.delete_table_row(table, table['ids'][0] + '-missing')
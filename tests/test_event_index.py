@@ -0,0 +1,52 @@
+"""Interval index over calendar events"""
+from app.blueprints import notes
+
+
+def add_event(owner_id, event_id, start, end=None, **fields):
+    event = {'id': f"{owner_id}-{event_id}", 'title': event_id, 'start': start, 'end': end, **fields}
+    return notes.store_event(event, owner_id)
+
+
+def titles(events):
+    return [event['title'] for event in events]
+
+
+def test_range_query_finds_overlapping_events(user_id):
+    add_event(user_id, 'morning', '2026-05-04T09:00:00', '2026-05-04T10:00:00')
+    add_event(user_id, 'lunch', '2026-05-04T12:00:00', '2026-05-04T13:00:00')
+    add_event(user_id, 'late', '2026-05-04T22:00:00', '2026-05-05T01:00:00')
+    add_event(user_id, 'trip', '2026-05-01', '2026-05-10')
+    add_event(user_id, 'next week', '2026-05-11T09:00:00')
+
+    assert titles(notes.query_events('2026-05-04T09:30:00', '2026-05-04T12:30:00', owner_id=user_id)) == ['trip', 'morning', 'lunch']
+    assert titles(notes.query_events('2026-05-05', '2026-05-05', owner_id=user_id)) == ['trip', 'late']
+    assert titles(notes.query_events('2026-05-11', None, owner_id=user_id)) == ['next week']
+
+
+def test_filters_by_class_and_type(user_id):
+    add_event(user_id, 'lecture', '2026-05-04T09:00:00', class_id='c1', type='class')
+    add_event(user_id, 'exam', '2026-05-06T09:00:00', class_id='c1', type='exam')
+    add_event(user_id, 'other exam', '2026-05-06T11:00:00', class_id='c2', type='exam')
+
+    assert titles(notes.query_events(class_id='c1', owner_id=user_id)) == ['lecture', 'exam']
+    assert titles(notes.query_events('2026-05-01', '2026-05-31', event_type='exam', owner_id=user_id)) == ['exam', 'other exam']
+    assert titles(notes.query_events(class_id='c1', event_type='exam', owner_id=user_id)) == ['exam']
+
+
+def test_batch_indexing_matches_one_at_a_time(user_id):
+    events = [{'id': f"{user_id}-b{i}", 'title': f"b{i}", 'start': f"2026-06-{28 - i:02d}T10:00:00"} for i in range(20)]
+    notes.store_events(events, user_id)
+
+    index = notes.get_event_index(user_id)
+    assert index['keys'] == sorted(index['keys'])
+    assert titles(notes.query_events('2026-06-20', '2026-06-21', owner_id=user_id)) == ['b8', 'b7']
+
+
+def test_discard_removes_event_from_index(user_id):
+    kept = add_event(user_id, 'kept', '2026-07-01T10:00:00')
+    gone = add_event(user_id, 'gone', '2026-07-01T11:00:00', class_id='c1')
+    notes.discard_event(gone)
+
+    assert notes.query_events('2026-07-01', '2026-07-01', owner_id=user_id) == [kept]
+    assert notes.query_events(class_id='c1', owner_id=user_id) == []
+    assert gone['id'] not in notes.calendar_events
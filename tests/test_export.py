@@ -0,0 +1,130 @@
+"""Page exports through the block renderer registry and streamed ZIP archives"""
+import io
+import json
+import zipfile
+
+import pytest
+
+from app.blueprints import notes
+
+
+BLOCKS = [
+    {'id': 'b1', 'type': 'heading2', 'content': 'Cells'},
+    {'id': 'b2', 'type': 'text', 'content': 'Cells are <small>'},
+    {'id': 'b3', 'type': 'bullet', 'content': 'nucleus', 'children': [{'id': 'b4', 'type': 'bullet', 'content': 'DNA'}]},
+    {'id': 'b5', 'type': 'todo', 'content': 'review', 'checked': True},
+    {'id': 'b6', 'type': 'quote', 'content': 'line one\nline two'},
+    {'id': 'b7', 'type': 'code', 'language': 'py', 'content': 'x = 1'},
+    {'id': 'b8', 'type': 'divider'},
+    {'id': 'b9', 'type': 'table', 'rows': [['Part', 'Role'], ['Ribosome', 'a | b']]},
+    {'id': 'b10', 'type': 'mystery', 'content': 'falls back to text'}
+]
+
+
+def make_page(owner_id, name, folder_id=None, blocks=BLOCKS, updated_at='2026-01-01T00:00:00'):
+    page = {'id': f"{owner_id}-{name}", 'title': name, 'blocks': blocks, 'updated_at': updated_at}
+    notes.pages_store[page['id']] = page
+    notes.add_to_partition('pages', page, owner_id)
+    if folder_id:
+        notes.set_page_folder(page, folder_id)
+    return page
+
+
+def new_folder(client, name, **fields):
+    return client.post('/notes/api/folders', json={'name': name, **fields}).get_json()['folder']['id']
+
+
+def download(client, url):
+    with client.get(url) as response:
+        return response.status_code, response.headers, response.get_data()
+
+
+def archive(client, url):
+    status, headers, data = download(client, url)
+    assert status == 200 and headers['Content-Type'] == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {name: zf.read(name).decode('utf-8') for name in zf.namelist()}
+
+
+def test_markdown_renderers():
+    markdown = ''.join(notes.render_page_markdown({'title': 'Biology', 'blocks': BLOCKS}))
+    for expected in ('# Biology\n', '## Cells\n', '- nucleus\n  - DNA\n', '- [x] review\n', '> line one\n> line two\n',
+                     '```py\nx = 1\n```\n', '---\n', '| Part | Role |\n| --- | --- |\n| Ribosome | a \\| b |\n',
+                     'falls back to text'):
+        assert expected in markdown
+
+
+def test_html_renderers_escape_content():
+    page = ''.join(notes.render_page_html({'title': 'A & B', 'blocks': BLOCKS}))
+    assert page.startswith('<!DOCTYPE html>') and '<title>A &amp; B</title>' in page
+    for expected in ('<h2>Cells</h2>', '<p>Cells are &lt;small&gt;</p>', '<ul><li>nucleus<ul><li>DNA</li></ul></li></ul>',
+                     "<input type='checkbox' checked> review", "<pre><code class='language-py'>x = 1</code></pre>",
+                     '<hr>', '<td>Ribosome</td><td>a | b</td>', '<p>falls back to text</p>'):
+        assert expected in page
+
+
+def test_database_blocks_render_their_rows(as_user):
+    user_id = as_user
+    db = {'id': f"db-{user_id}", 'name': 'Reading', 'properties': [
+        {'id': 'name', 'name': 'Name', 'type': 'text'},
+        {'id': 'status', 'name': 'Status', 'type': 'select', 'options': [{'id': 'todo', 'name': 'To do'}]}]}
+    notes.databases_store[db['id']] = db
+    notes.add_to_partition('databases', db, user_id)
+    notes.append_table_rows(db, notes.get_row_table(db), [{'name': 'Ch. 1', 'status': 'todo'}])
+    block = {'id': 'b1', 'type': 'database', 'database_id': db['id']}
+
+    markdown = ''.join(notes.render_page_markdown({'title': 'T', 'blocks': [block]}))
+    page = ''.join(notes.render_page_html({'title': 'T', 'blocks': [block]}))
+    assert '| Name | Status |\n| --- | --- |\n| Ch. 1 | To do |\n' in markdown
+    assert '<th>Name</th><th>Status</th>' in page and '<td>Ch. 1</td><td>To do</td>' in page
+
+
+@pytest.mark.parametrize('format, mimetype', [('md', 'text/markdown'), ('html', 'text/html'), ('json', 'application/json')],
+                         ids=['md', 'html', 'json'])
+def test_page_export_streams_each_format(client, user_id, format, mimetype):
+    page = make_page(user_id, 'Cell Notes')
+    status, headers, data = download(client, f"/notes/api/page/{page['id']}/export/{format}")
+    assert status == 200 and headers['Content-Type'].startswith(mimetype)
+    assert f'filename="Cell Notes.{format}"' in headers['Content-Disposition']
+    if format == 'json':
+        assert json.loads(data)['blocks'] == BLOCKS
+    assert download(client, f"/notes/api/page/{page['id']}/export/pdf")[0] == 400
+
+
+def test_folder_export_archives_the_subtree(client, user_id):
+    biology = new_folder(client, 'Biology')
+    labs = new_folder(client, 'Labs', parent_id=biology)
+    cells = make_page(user_id, 'Cells', biology)
+    lab = make_page(user_id, 'Lab 1', labs)
+    make_page(user_id, 'Elsewhere')
+
+    files = archive(client, f"/notes/api/folders/{biology}/export/md")
+    assert set(files) == {f"pages/Biology/Cells-{cells['id']}.md", f"pages/Biology/Labs/Lab 1-{lab['id']}.md", 'manifest.json'}
+    assert files[f"pages/Biology/Cells-{cells['id']}.md"] == ''.join(notes.render_page_markdown(cells))
+
+    manifest = json.loads(files['manifest.json'])
+    assert (manifest['scope'], manifest['format']) == ('folder', 'md')
+    assert sorted(manifest['page_ids']) == sorted([cells['id'], lab['id']])
+    assert {folder['path'] for folder in manifest['folders']} == {'Biology/', 'Biology/Labs/'}
+
+
+def test_workspace_delta_lists_every_page_but_ships_only_changes(client, user_id):
+    folder = new_folder(client, 'Chem')
+    old = make_page(user_id, 'Old', folder, updated_at='2026-01-01T00:00:00')
+    new = make_page(user_id, 'New', updated_at='2026-02-01T00:00:00')
+
+    files = archive(client, '/notes/api/export/html?since=2026-01-15T00:00:00')
+    assert set(files) == {f"pages/New-{new['id']}.html", 'manifest.json'}
+    manifest = json.loads(files['manifest.json'])
+    assert sorted(manifest['page_ids']) == sorted([old['id'], new['id']])
+    assert [page['id'] for page in manifest['pages']] == [new['id']]
+    assert download(client, '/notes/api/export/pdf')[0] == 400
+
+
+def test_class_export_uses_the_class_folder(client, user_id, new_class):
+    cls = new_class()
+    page = make_page(user_id, 'Syllabus', cls['folder_id'])
+    files = archive(client, f"/notes/api/classes/{cls['id']}/export/json")
+    folder_name = notes.safe_filename(notes.folders_store[cls['folder_id']]['name'])
+    assert json.loads(files[f"pages/{folder_name}/Syllabus-{page['id']}.json"])['id'] == page['id']
+    assert json.loads(files['manifest.json'])['scope'] == 'class'
@@ -0,0 +1,123 @@
+"""Flashcard decks: incremental sync, SM-2 reviews and the due index"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.blueprints import notes
+
+
+def make_page(owner_id, page_id, *texts, title='Cells'):
+    page = {'id': f"{owner_id}-{page_id}", 'title': title,
+            'blocks': [{'id': f"b{i}", 'type': 'paragraph', 'content': text} for i, text in enumerate(texts)]}
+    notes.pages_store[page['id']] = page
+    return notes.add_to_partition('pages', page, owner_id)
+
+
+def two_facts(subject):
+    return f"The {subject} is studied in this unit. The {subject} comes up again on the exam."
+
+
+def sync(client, page, count=50):
+    return client.post('/notes/api/flashcards/decks', json={'page_id': page['id'], 'count': count}).get_json()
+
+
+def test_reviews_follow_sm2(user_id):
+    deck = notes.get_or_create_deck('page', 'sm2', 'SM-2', owner_id=user_id)
+    card = notes.add_card(deck, 'front', 'back', 'hash', None, None)
+
+    assert [notes.review_card(card, 'good')['interval'] for _ in range(3)] == [1, 6, 15]
+    assert card['ease'] == pytest.approx(2.5)
+
+    notes.review_card(card, 'again')
+    assert (card['interval'], card['repetitions'], card['lapses']) == (1, 0, 1)
+    assert card['ease'] == pytest.approx(1.96)
+    for _ in range(5):
+        notes.review_card(card, 0)
+    assert card['ease'] == notes.MIN_EASE
+
+    with pytest.raises(ValueError):
+        notes.review_card(card, 'perfect')
+
+
+def test_due_index_tracks_reviews_and_suspension(client, user_id):
+    deck = notes.get_or_create_deck('page', 'due', 'Due', owner_id=user_id)
+    other = notes.get_or_create_deck('page', 'due-other', 'Other', owner_id=user_id)
+    first, second = (notes.add_card(deck, f"q{i}", 'a', f"h{i}", None, None) for i in range(2))
+    notes.add_card(other, 'q', 'a', 'h', None, None)
+
+    client.post(f"/notes/api/flashcards/cards/{first['id']}/review", json={'rating': 'good'})
+    due = client.get('/notes/api/flashcards/due').get_json()
+    assert due['due_count'] == 2 and first['id'] not in [c['id'] for c in due['cards']]
+
+    later = (datetime.now() + timedelta(days=2)).isoformat()
+    assert notes.due_cards(later, owner_id=user_id)[1] == 3
+    assert [c['id'] for c in notes.due_cards(later, deck['id'], owner_id=user_id)[0]] == [second['id'], first['id']]
+
+    client.put(f"/notes/api/flashcards/cards/{second['id']}", json={'suspended': True})
+    assert notes.due_cards(later, deck['id'], owner_id=user_id)[1] == 1
+
+
+def test_sync_only_regenerates_changed_blocks(client, user_id):
+    page = make_page(user_id, 'sync', two_facts('nucleus'), two_facts('membrane'))
+    result = sync(client, page)
+    assert (result['generated'], result['kept'], result['removed'], result['pending_blocks']) == (4, 0, 0, 0)
+    reviewed = result['cards'][0]
+    client.post(f"/notes/api/flashcards/cards/{reviewed['id']}/review", json={'rating': 'easy'})
+
+    assert sync(client, page)['generated'] == 0
+
+    page['blocks'][1]['content'] = two_facts('cell wall')
+    result = sync(client, page)
+    assert (result['generated'], result['kept'], result['removed']) == (2, 2, 2)
+    assert notes.flashcards_store[reviewed['id']]['repetitions'] == 1
+
+    page['blocks'].pop()
+    result = sync(client, page)
+    assert (result['generated'], result['kept'], result['removed']) == (0, 2, 2)
+
+
+def test_blocks_cut_off_by_count_stay_pending(client, user_id):
+    page = make_page(user_id, 'count', *(two_facts(topic) for topic in ('nucleus', 'membrane', 'ribosome', 'vacuole')))
+
+    response = client.post('/notes/api/ai/flashcards', json={'page_id': page['id'], 'count': 3}).get_json()
+    assert len(response['flashcards']) == 3
+    assert (response['generated'], response['pending_blocks']) == (3, 2)
+
+    response = client.post('/notes/api/ai/flashcards', json={'page_id': page['id'], 'count': 30}).get_json()
+    assert (response['generated'], response['kept'], response['pending_blocks']) == (4, 3, 0)
+    assert len(response['flashcards']) == 7
+
+
+def test_short_notes_fall_back_to_the_whole_text(client, user_id):
+    page = make_page(user_id, 'bullets', 'Nucleus holds the DNA', 'Ribosomes build proteins')
+    text = 'Mitochondria make most of the ATP. Ribosomes build proteins from mRNA.'
+
+    response = client.post('/notes/api/ai/flashcards', json={'page_id': page['id'], 'text': text}).get_json()
+    assert [card['back'] for card in response['flashcards']] == ['Mitochondria make most of the ATP',
+                                                                   'Ribosomes build proteins from mRNA']
+
+    response = client.post('/notes/api/ai/flashcards', json={'page_id': page['id']}).get_json()
+    assert response['flashcards'] == [{'front': 'What do you know about: Nucleus holds the DNA\nRibosomes build proteins...?',
+                                       'back': 'Nucleus holds the DNA\nRibosomes build proteins'}]
+
+
+def test_decks_and_cards_are_private(client, user_id):
+    stranger = f"{user_id}-stranger"
+    page = make_page(stranger, 'private', two_facts('golgi'))
+    deck = notes.get_or_create_deck('page', page['id'], 'Private', owner_id=stranger)
+    notes.sync_deck(deck)
+    card_id = next(iter(deck['blocks'].values()))[0]
+
+    assert client.post('/notes/api/flashcards/decks', json={'page_id': page['id']}).status_code == 404
+    assert client.get(f"/notes/api/flashcards/decks/{deck['id']}").status_code == 404
+    assert client.post(f"/notes/api/flashcards/cards/{card_id}/review", json={'rating': 'good'}).status_code == 404
+    assert client.get('/notes/api/flashcards/due').get_json()['due_count'] == 0
+
+
+def test_rejects_non_numeric_counts(client, user_id):
+    page = make_page(user_id, 'counts', two_facts('ribosome'))
+    for count in ('lots', [5], {'n': 5}):
+        response = client.post('/notes/api/flashcards/decks', json={'page_id': page['id'], 'count': count})
+        assert response.status_code == 400
+    assert notes.get_partition('decks', user_id) == {}
+    assert client.get('/notes/api/flashcards/due?limit=lots').status_code == 400
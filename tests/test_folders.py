@@ -0,0 +1,89 @@
+"""Folder membership index: page order, nesting and deletes"""
+from app.blueprints import notes
+
+
+def make_pages(owner_id, *names):
+    pages = []
+    for name in names:
+        page = {'id': f"{owner_id}-{name}", 'title': name, 'blocks': []}
+        notes.pages_store[page['id']] = page
+        pages.append(notes.add_to_partition('pages', page, owner_id))
+    return pages
+
+
+def new_folder(client, name, **fields):
+    return client.post('/notes/api/folders', json={'name': name, **fields}).get_json()['folder']['id']
+
+
+def titles(folder_id):
+    return [notes.pages_store[page_id]['title'] for page_id in notes.folder_pages_index[folder_id]]
+
+
+def assert_consistent(owner_id):
+    """Every indexed page points back at its folder and every filed page is indexed"""
+    for folder_id in notes.get_partition('folders', owner_id):
+        assert all(notes.pages_store[pid]['folder_id'] == folder_id for pid in notes.folder_pages_index[folder_id])
+    for page in notes.get_partition('pages', owner_id).values():
+        if page.get('folder_id'):
+            assert page['id'] in notes.folder_pages_index[page['folder_id']]
+
+
+def test_moves_keep_both_folders_in_order(client, user_id):
+    a, b, c, d = make_pages(user_id, 'a', 'b', 'c', 'd')
+    first = new_folder(client, 'First')
+    second = new_folder(client, 'Second')
+    for page in (a, b, c):
+        client.post(f"/notes/api/folders/{first}/pages", json={'page_id': page['id']})
+    client.post(f"/notes/api/folders/{first}/pages", json={'page_id': d['id'], 'position': 1})
+    assert titles(first) == ['a', 'd', 'b', 'c']
+
+    client.post(f"/notes/api/pages/{b['id']}/move-to-folder", json={'folder_id': second})
+    client.post('/notes/api/pages/move-to-folder', json={'page_ids': [c['id'], a['id']], 'folder_id': second, 'position': 0})
+    assert titles(first) == ['d']
+    assert titles(second) == ['c', 'a', 'b']
+
+    client.post(f"/notes/api/pages/{d['id']}/move-to-folder", json={'folder_id': None})
+    assert titles(first) == [] and d['folder_id'] is None
+    assert_consistent(user_id)
+
+
+def test_reorder_is_all_or_nothing(client, user_id):
+    a, b = make_pages(user_id, 'a', 'b')
+    parent = new_folder(client, 'Parent')
+    x = new_folder(client, 'X', parent_id=parent)
+    y = new_folder(client, 'Y', parent_id=parent)
+    client.post('/notes/api/pages/move-to-folder', json={'page_ids': [a['id'], b['id']], 'folder_id': parent})
+
+    bad = client.post(f"/notes/api/folders/{parent}/reorder", json={'page_ids': [b['id'], a['id']], 'folder_ids': [y]})
+    assert bad.status_code == 400
+    assert titles(parent) == ['a', 'b']
+
+    client.post(f"/notes/api/folders/{parent}/reorder", json={'page_ids': [b['id'], a['id']], 'folder_ids': [y, x]})
+    assert titles(parent) == ['b', 'a']
+    assert list(notes.folder_children_index[parent]) == [y, x]
+
+
+def test_delete_unfiles_pages_and_lifts_subfolders(client, user_id):
+    page, = make_pages(user_id, 'a')
+    outer = new_folder(client, 'Outer')
+    inner = new_folder(client, 'Inner', parent_id=outer)
+    client.post(f"/notes/api/folders/{outer}/pages", json={'page_id': page['id']})
+
+    assert client.delete(f"/notes/api/folders/{outer}").status_code == 200
+    assert outer not in notes.folder_pages_index and outer not in notes.folder_children_index
+    assert page['folder_id'] is None
+    assert notes.folders_store[inner]['parent_id'] is None
+    assert list(notes.folder_children_index[('root', user_id)]) == [inner]
+    assert_consistent(user_id)
+
+
+def test_rejects_non_integer_positions(client, user_id):
+    page, = make_pages(user_id, 'a')
+    folder = new_folder(client, 'Folder')
+    other = new_folder(client, 'Other')
+    for url, data in ((f"/notes/api/folders/{folder}/pages", {'page_id': page['id']}),
+                      (f"/notes/api/pages/{page['id']}/move-to-folder", {'folder_id': folder}),
+                      ('/notes/api/pages/move-to-folder', {'page_ids': [page['id']], 'folder_id': folder})):
+        assert client.post(url, json={**data, 'position': 'abc'}).status_code == 400
+    assert client.put(f"/notes/api/folders/{other}", json={'parent_id': folder, 'position': '1'}).status_code == 400
+    assert page.get('folder_id') is None
@@ -0,0 +1,67 @@
+"""Grade books: weighted categories, projections, needed scores and GPA"""
+import pytest
+
+from app.blueprints import notes
+
+
+def make_class(class_id, assignments, **fields):
+    cls = {'id': class_id, 'code': 'BIO 101', 'name': 'Biology', 'assignments': assignments, **fields}
+    notes.invalidate_grade_book(cls)
+    return cls
+
+
+def weighted_class(class_id):
+    return make_class(class_id, [
+        {'id': f"{class_id}-hw1", 'title': 'HW 1', 'type': 'homework', 'points': 10, 'grade': 9},
+        {'id': f"{class_id}-hw2", 'title': 'HW 2', 'type': 'homework', 'points': 10, 'grade': 7},
+        {'id': f"{class_id}-mid", 'title': 'Midterm', 'type': 'exam', 'points': 100, 'grade': 80},
+        {'id': f"{class_id}-final", 'title': 'Final Exam', 'type': 'exam', 'points': 100, 'grade': None}
+    ], grading={'weights': {'Homework': '40%', 'Exams': 60}}, credits=4, term='Fall 2026')
+
+
+def test_weighted_categories(user_id):
+    grades = notes.class_grades(weighted_class(f"grades-{user_id}"))
+    assert grades['mode'] == 'categories'
+    assert (grades['current'], grades['projected'], grades['minimum'], grades['maximum']) == (80.0, 80.0, 56.0, 86.0)
+    assert grades['current_letter'] == 'B-'
+    assert [(c['name'], c['share'], c['average']) for c in grades['categories']] == [
+        ('Homework', 40.0, 80.0), ('Exams', 60.0, 80.0)]
+
+
+def test_needed_score_on_the_final(user_id):
+    cls = weighted_class(f"needed-{user_id}")
+    final = notes.final_assignment(cls)
+    assert final['title'] == 'Final Exam'
+    assert notes.needed_score(cls, final['id'], 90) == pytest.approx(113.333, abs=1e-3)
+    assert notes.needed_score(cls, final['id'], notes.parse_grade_target(cls, 'C')) == pytest.approx(56.667, abs=1e-3)
+    with pytest.raises(ValueError):
+        notes.needed_score(cls, cls['assignments'][0]['id'], 90)
+
+
+def test_incremental_grade_update_matches_rebuild(user_id):
+    cls = make_class(f"points-{user_id}", [
+        {'id': f"{user_id}-a{i}", 'title': f"A{i}", 'points': 10 * (i + 1), 'grade': None} for i in range(5)
+    ])
+    assert notes.class_grades(cls)['mode'] == 'points'
+    cls['assignments'][2]['grade'] = '90%'
+    notes.update_assignment_grade(cls, cls['assignments'][2])
+    cls['assignments'][4]['grade'] = 25
+    notes.update_assignment_grade(cls, cls['assignments'][4])
+    incremental = notes.class_grades(cls)
+
+    notes.invalidate_grade_book(cls)
+    assert notes.class_grades(cls) == incremental
+    assert incremental['current'] == pytest.approx((27 + 25) / 80 * 100, abs=0.01)
+
+
+def test_nothing_graded_has_no_current_grade(user_id):
+    grades = notes.class_grades(make_class(f"empty-{user_id}", [{'id': f"{user_id}-x", 'title': 'X', 'points': 10}]))
+    assert grades['current'] is None and grades['projected'] is None and grades['current_letter'] is None
+
+
+def test_term_gpa_weights_by_credits(user_id):
+    first = weighted_class(f"gpa1-{user_id}")
+    second = make_class(f"gpa2-{user_id}", [], grade='A', credits=2, term='Fall 2026')
+    terms = notes.term_gpas([first, second])
+    assert len(terms) == 1
+    assert terms[0]['gpa'] == round((2.7 * 4 + 4.0 * 2) / 6, 2)
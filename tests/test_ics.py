@@ -0,0 +1,54 @@
+"""ICS export, subscription feeds and import"""
+import io
+
+from app.blueprints import notes
+
+
+def add_class(owner_id, class_id, code):
+    cls = {'id': class_id, 'code': code, 'name': 'Secret Seminar'}
+    notes.classes_store[class_id] = cls
+    return notes.add_to_partition('classes', cls, owner_id)
+
+
+def feed_path(client):
+    url = client.post('/notes/api/calendar/feed').get_json()['url']
+    return url.split('localhost', 1)[1]
+
+
+def test_feed_does_not_leak_other_owners_classes(client, user_id):
+    add_class('someone-else', f"c-other-{user_id}", 'PRIV 101')
+    add_class(user_id, f"c-own-{user_id}", 'OWN 101')
+    path = feed_path(client)
+
+    response = client.get(f"{path}?class_id=c-other-{user_id}")
+    assert response.status_code == 404
+    assert b'PRIV' not in response.data
+
+    with client.get(f"{path}?class_id=c-own-{user_id}") as response:
+        assert response.status_code == 200
+        assert 'OWN 101' in response.headers['Content-Disposition']
+
+
+def test_feed_etag_and_revocation(client, user_id):
+    notes.store_event({'id': f"{user_id}-e1", 'title': 'Lab', 'start': '2026-03-02T14:00:00', 'end': '2026-03-02T15:00:00'}, user_id)
+    path = feed_path(client)
+
+    with client.get(path) as first:
+        assert b'SUMMARY:Lab' in first.data
+    assert client.get(path, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    client.delete('/notes/api/calendar/feed')
+    assert client.get(path).status_code == 404
+
+
+def test_import_round_trips_export(client, user_id):
+    notes.store_event({'id': f"{user_id}-e2", 'title': 'Weekly, review; notes', 'start': '2026-03-02T14:00:00',
+                       'end': '2026-03-02T15:00:00', 'recurrence': {'frequency': 'weekly', 'interval': 1, 'count': 4}}, user_id)
+    with client.get('/notes/api/calendar/export.ics') as response:
+        exported = response.data
+
+    other = f"{user_id}-importer"
+    notes.import_ics(io.BytesIO(exported), other)
+    imported = notes.query_events(owner_id=other)
+    assert [(e['title'], e['start'], e['recurrence']['count']) for e in imported] == [
+        ('Weekly, review; notes', '2026-03-02T14:00:00', 4)]
@@ -0,0 +1,103 @@
+"""Background Markdown/text/JSON/ZIP import jobs"""
+import io
+import json
+import threading
+import time
+import zipfile
+
+from app.blueprints import notes
+
+
+def upload(client, *files, **form):
+    data = {'files': [(io.BytesIO(content), name) for name, content in files], **form}
+    response = client.post('/notes/api/import', data=data, content_type='multipart/form-data')
+    assert response.status_code == 202
+    return response.get_json()['job_id']
+
+
+def wait_for(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/notes/api/import/{job_id}").get_json()['job']
+        if job['finished_at']:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"import job {job_id} did not finish")
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def pages_by_title(owner_id):
+    return {page['title']: page for page in notes.get_partition('pages', owner_id).values()}
+
+
+def test_zip_import_mirrors_directories_as_folders(client, user_id):
+    exported = {'title': 'Exported', 'icon': '🧪', 'blocks': [{'id': 'old', 'type': 'text', 'content': 'kept',
+                                                              'children': [{'type': 'bullet', 'content': 'nested'}]}]}
+    job_id = upload(client, ('term.zip', zip_bytes({
+        'Biology/Cells.md': '# Cells\n\nThe nucleus holds DNA.\n\n- membrane\n',
+        'Biology/Labs/lab1.txt': 'Measure the pH.\n\nRecord results.',
+        'export.json': json.dumps(exported),
+        'Biology/diagram.png': b'\x89PNG'
+    })))
+
+    job = wait_for(client, job_id)
+    assert (job['status'], job['total'], job['processed'], job['errors']) == ('completed', 3, 3, [])
+    assert (job['pages_created'], job['folders_created']) == (3, 2)
+
+    pages = pages_by_title(user_id)
+    assert set(pages) == {'Cells', 'lab1', 'Exported'}
+    assert [b['type'] for b in pages['Cells']['blocks']] == ['text', 'bullet']
+    biology = notes.folders_store[pages['Cells']['folder_id']]
+    labs = notes.folders_store[pages['lab1']['folder_id']]
+    assert (biology['name'], labs['name'], labs['parent_id']) == ('Biology', 'Labs', biology['id'])
+    exported_page = pages['Exported']
+    assert exported_page['icon'] == '🧪' and exported_page.get('folder_id') is None
+    assert exported_page['blocks'][0]['id'] != 'old' and exported_page['blocks'][0]['children'][0]['id']
+
+
+def test_bad_files_are_reported_and_the_rest_imported(client, user_id):
+    job_id = upload(
+        client,
+        ('good.md', b'# Good\n\nStill imported.\n'),
+        ('strings.json', json.dumps({'title': 'Strings', 'blocks': ['x']}).encode()),
+        ('children.json', json.dumps({'title': 'Children', 'blocks': [{'type': 'text', 'children': 'x'}]}).encode()),
+        ('broken.json', b'{"title": '),
+        ('photo.png', b'\x89PNG'),
+        ('more.zip', zip_bytes({'notes/also-good.txt': 'Imported from the archive.', 'notes/bad.json': '[{"blocks": 1'}))
+    )
+
+    job = wait_for(client, job_id)
+    assert job['status'] == 'completed'
+    assert sorted(error['file'] for error in job['errors']) == [
+        'broken.json', 'children.json', 'notes/bad.json', 'photo.png', 'strings.json']
+    assert job['pages_created'] == 2 and job['processed'] == job['total'] == 7
+    assert set(pages_by_title(user_id)) == {'Good', 'also-good'}
+
+
+def test_import_jobs_are_private(client, user_id):
+    job_id = upload(client, ('a.txt', b'text'))
+    wait_for(client, job_id)
+    with client.session_transaction() as sess:
+        sess['user_id'] = f"{user_id}-other"
+    assert client.get(f"/notes/api/import/{job_id}").status_code == 404
+
+
+def test_ids_are_unique_across_threads():
+    ids = []
+
+    def allocate():
+        ids.extend([notes.new_page_id() for _ in range(500)] + [notes.new_block_id() for _ in range(500)])
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == len(ids) == 8000
@@ -0,0 +1,28 @@
+"""Per-owner partitioning of the notes stores"""
+from app.blueprints import notes
+
+
+def add_database(db_id, owner_id):
+    db = {'id': db_id, 'name': 'Reading list', 'properties': [{'id': 'title', 'name': 'Title', 'type': 'text'}]}
+    notes.databases_store[db_id] = db
+    return notes.add_to_partition('databases', db, owner_id)
+
+
+def test_database_routes_only_see_own_databases(client, user_id):
+    add_database('db-own', user_id)
+    add_database('db-other', 'someone-else')
+
+    assert client.get('/notes/api/database/db-own').status_code == 200
+    assert client.get('/notes/api/database/db-other').status_code == 404
+    assert client.put('/notes/api/database/db-other', json={'name': 'x'}).status_code == 404
+    assert client.post('/notes/api/database/db-other/row', json={'properties': {}}).status_code == 404
+    assert notes.databases_store['db-other']['name'] == 'Reading list'
+
+
+def test_pages_are_partitioned(as_user):
+    page = {'id': 'p-part', 'title': 'Mine', 'blocks': []}
+    notes.pages_store[page['id']] = page
+    notes.add_to_partition('pages', page, 'someone-else')
+
+    assert notes.get_owned('pages', 'p-part') is None
+    assert 'p-part' in notes.get_partition('pages', 'someone-else')
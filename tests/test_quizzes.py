@@ -0,0 +1,108 @@
+"""Question banks: incremental sync, adaptive selection and grading"""
+from app.blueprints import notes
+
+
+TOPICS = {
+    'Cells': ['Mitochondria release energy from glucose molecules', 'Ribosomes assemble proteins from amino acids',
+              'Chloroplasts capture sunlight inside plant leaves'],
+    'Genetics': ['Chromosomes carry genes inside every nucleus', 'Mutations change individual bases in sequences',
+                 'Alleles describe alternative versions of genes'],
+    'Ecology': ['Predators regulate populations of their prey species', 'Decomposers recycle nutrients back into soil',
+                'Producers convert sunlight into chemical energy'],
+    'Evolution': ['Selection favors traits improving reproductive success', 'Fossils record organisms from earlier periods',
+                  'Speciation splits lineages into separate groups']
+}
+
+
+def make_page(owner_id, page_id, topics):
+    blocks = []
+    for topic, texts in topics.items():
+        blocks.append({'id': f"h-{topic}", 'type': 'heading2', 'content': topic})
+        blocks.extend({'id': f"{topic}-{i}", 'type': 'paragraph', 'content': f"{text}."} for i, text in enumerate(texts))
+    page = {'id': f"{owner_id}-{page_id}", 'title': 'Biology', 'blocks': blocks}
+    notes.pages_store[page['id']] = page
+    return notes.add_to_partition('pages', page, owner_id)
+
+
+def quiz(client, page, count):
+    return client.post('/notes/api/quizzes', json={'page_id': page['id'], 'count': count}).get_json()
+
+
+def answer(client, bank_id, answers):
+    return client.post(f"/notes/api/quizzes/banks/{bank_id}/attempts", json={'answers': answers})
+
+
+def stored_answer(question):
+    return notes.quiz_questions_store[question['id']]['answer']
+
+
+def test_repeat_quiz_reuses_the_bank(client, user_id, monkeypatch):
+    page = make_page(user_id, 'reuse', {'Cells': TOPICS['Cells']})
+    calls = []
+    generate = notes.generate_block_questions
+    monkeypatch.setattr(notes, 'generate_block_questions', lambda *args: calls.append(args) or generate(*args))
+
+    first = quiz(client, page, 3)
+    assert (first['generated'], first['pending_blocks'], len(calls)) == (3, 0, 1)
+    second = quiz(client, page, 3)
+    assert (second['generated'], second['kept'], len(calls)) == (0, 3, 1)
+    assert {q['id'] for q in second['questions']} == {q['id'] for q in first['questions']}
+
+
+def test_blocks_cut_off_by_the_budget_are_covered_later(client, user_id):
+    page = make_page(user_id, 'coverage', TOPICS)
+    bank_id = None
+    for expected_pending in (8, 4, 0):
+        result = quiz(client, page, 2)
+        assert (result['generated'], result['pending_blocks']) == (4, expected_pending)
+        bank_id = result['bank_id']
+
+    bank = notes.get_partition('quiz_banks', user_id)[bank_id]
+    assert {q['topic'] for q in notes.bank_questions(bank)} == set(TOPICS)
+    assert quiz(client, page, 2)['generated'] == 0
+
+
+def test_grading_and_weak_topics_first(client, user_id):
+    page = make_page(user_id, 'adaptive', {topic: TOPICS[topic] for topic in ('Cells', 'Ecology')})
+    result = quiz(client, page, 6)
+    questions = result['questions']
+
+    ecology = [question for question in questions if question['topic'] == 'Ecology']
+    first = ecology[0]
+    # An option letter picks that option; case and spacing are ignored
+    answers = [{'question_id': first['id'], 'answer': chr(ord('A') + first['options'].index(stored_answer(first)))}]
+    answers += [{'question_id': q['id'], 'answer': f"  {stored_answer(q).upper()} "} for q in ecology[1:]]
+    answers += [{'question_id': q['id'], 'answer': 'no idea'} for q in questions if q['topic'] == 'Cells']
+    response = answer(client, result['bank_id'], answers).get_json()
+    assert (response['attempt']['score'], response['attempt']['total']) == (3, 6)
+    assert [t['topic'] for t in response['topics']] == ['Cells', 'Ecology']
+
+    assert {q['topic'] for q in quiz(client, page, 3)['questions']} == {'Cells'}
+
+
+def test_malformed_answers_are_rejected(client, user_id):
+    page = make_page(user_id, 'malformed', {'Cells': TOPICS['Cells']})
+    bank_id = quiz(client, page, 1)['bank_id']
+    for answers in (['x'], [{'question_id': 'q-1'}, 3], {'question_id': 'q-1'}):
+        assert answer(client, bank_id, answers).status_code == 400
+    assert answer(client, 'bank-missing', []).status_code == 404
+
+
+def test_quizzes_hide_answers_until_graded(client, user_id):
+    page = make_page(user_id, 'hidden', {'Cells': TOPICS['Cells']})
+    result = quiz(client, page, 3)
+    for question in result['questions']:
+        assert set(question).isdisjoint(notes.HIDDEN_QUESTION_FIELDS) and question['question']
+    ai = client.post('/notes/api/ai/quiz', json={'page_id': page['id'], 'count': 3}).get_json()
+    assert all(set(question).isdisjoint(notes.HIDDEN_QUESTION_FIELDS) for question in ai['questions'])
+
+    question = result['questions'][0]
+    graded = answer(client, result['bank_id'], [{'question_id': question['id'], 'answer': 'no idea'}]).get_json()
+    assert graded['attempt']['results'][0]['correct_answer'] == stored_answer(question)
+
+
+def test_rejects_non_numeric_counts(client, user_id):
+    page = make_page(user_id, 'counts', {'Cells': TOPICS['Cells']})
+    for count in ('x', [3], None):
+        assert client.post('/notes/api/quizzes', json={'page_id': page['id'], 'count': count}).status_code == 400
+        assert client.post('/notes/api/ai/quiz', json={'page_id': page['id'], 'count': count}).status_code == 400
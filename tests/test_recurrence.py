@@ -0,0 +1,65 @@
+"""Recurrence rules and lazy expansion of recurring events"""
+import pytest
+
+from app.blueprints import notes
+
+
+def series(rule, start='2026-01-05T09:00:00', end='2026-01-05T10:00:00', **fields):
+    return {'id': f"series-{id(rule)}", 'title': 'Series', 'start': start, 'end': end,
+            'recurrence': notes.normalize_recurrence(rule), **fields}
+
+
+def starts(occurrences):
+    return [occurrence['start'] for occurrence in occurrences]
+
+
+def test_weekly_days_within_window():
+    event = series({'frequency': 'weekly', 'days': ['wednesday', 'monday']})
+    occurrences = notes.expand_event(event, '2026-01-12T00:00:00', '2026-01-18T23:59:59', cache=False)
+    assert starts(occurrences) == ['2026-01-12T09:00:00', '2026-01-14T09:00:00']
+    assert occurrences[0]['id'] == f"{event['id']}@2026-01-12"
+    assert occurrences[0]['series_id'] == event['id']
+
+
+def test_count_is_numbered_from_the_first_occurrence():
+    event = series({'frequency': 'daily', 'interval': 2, 'count': 3})
+    assert starts(notes.expand_event(event, '2026-01-06T00:00:00', None, cache=False)) == [
+        '2026-01-07T09:00:00', '2026-01-09T09:00:00']
+
+
+def test_until_and_missing_month_days():
+    event = series({'frequency': 'monthly', 'until': '2026-06-30'}, start='2026-01-31', end='2026-01-31')
+    assert starts(notes.expand_event(event, cache=False)) == ['2026-01-31', '2026-03-31', '2026-05-31']
+
+
+def test_window_far_in_the_future_jumps_ahead():
+    event = series({'frequency': 'daily'})
+    occurrences = notes.expand_event(event, '2036-01-05T00:00:00', '2036-01-06T23:59:59', cache=False)
+    assert starts(occurrences) == ['2036-01-05T09:00:00', '2036-01-06T09:00:00']
+
+
+def test_exceptions_cancel_and_move_occurrences():
+    event = series({'frequency': 'daily', 'count': 3}, exceptions={
+        '2026-01-06': {'cancelled': True},
+        '2026-01-07': {'start': '2026-01-07T15:00:00', 'end': '2026-01-07T16:00:00'}
+    })
+    assert starts(notes.expand_event(event, cache=False)) == ['2026-01-05T09:00:00', '2026-01-07T15:00:00']
+    assert notes.is_occurrence_date(event, '2026-01-05')
+    assert not notes.is_occurrence_date(event, '2026-01-08')
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        notes.normalize_recurrence({'frequency': 'hourly'})
+    with pytest.raises(ValueError):
+        notes.normalize_recurrence({'frequency': 'weekly', 'days': ['funday']})
+    with pytest.raises(ValueError):
+        notes.normalize_recurrence({'frequency': 'daily', 'count': 'many'})
+
+
+def test_recurring_events_are_expanded_by_range_queries(user_id):
+    event = series({'frequency': 'weekly'})
+    event['id'] = f"{user_id}-weekly"
+    notes.store_event(event, user_id)
+    found = notes.query_events('2026-02-01', '2026-02-28', owner_id=user_id)
+    assert starts(found) == ['2026-02-02T09:00:00', '2026-02-09T09:00:00', '2026-02-16T09:00:00', '2026-02-23T09:00:00']
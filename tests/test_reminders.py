@@ -0,0 +1,96 @@
+"""Reminder heap, scheduling and in-app notifications
+
+The tests drive the heap with explicit times instead of the background thread.
+"""
+import pytest
+
+from app.blueprints import notes
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    """Fresh reminder heap, with the scheduler thread marked as started so none is spawned"""
+    monkeypatch.setattr(notes, 'reminder_heap', [])
+    monkeypatch.setattr(notes, 'reminder_generations', {})
+    monkeypatch.setattr(notes, 'stale_reminders', 0)
+    monkeypatch.setattr(notes, 'reminder_scheduler_started', True)
+    monkeypatch.setattr(notes, 'REMINDER_SINKS', ['in_app'])
+
+
+def add_event(owner_id, event_id, start, reminder=15, **fields):
+    event = {'id': f"{owner_id}-{event_id}", 'title': event_id, 'start': start, 'reminder': reminder, **fields}
+    return notes.store_event(event, owner_id)
+
+
+def fire_due(now):
+    due = notes.pop_due_reminders(now)
+    for entry in due:
+        notes.fire_reminder(entry)
+    return [(entry[2], entry[4]) for entry in due]
+
+
+def queued():
+    """(fire time, occurrence date) of the queued reminders that are still current"""
+    return sorted((entry[0], entry[4]) for entry in notes.reminder_heap
+                  if entry[3] == notes.reminder_generations.get(entry[2], 0))
+
+
+def test_reminders_pop_in_fire_time_order(client, user_id):
+    lecture = add_event(user_id, 'Lecture', '2030-03-04T09:00:00')
+    lab = add_event(user_id, 'Lab', '2030-03-04T10:00:00', reminder=90)
+    add_event(user_id, 'No reminder', '2030-03-04T08:00:00', reminder=None)
+
+    assert fire_due('2030-03-04T08:29:59') == []
+    assert fire_due('2030-03-04T08:45:00') == [(lab['id'], None), (lecture['id'], None)]
+    assert notes.reminder_heap == []
+
+    notifications = client.get('/notes/api/notifications').get_json()
+    assert [n['title'] for n in notifications['notifications']] == ['Lecture', 'Lab']
+    assert notifications['unread'] == 2
+
+
+def test_cancelled_and_rescheduled_reminders(user_id):
+    exam = add_event(user_id, 'Exam', '2030-03-04T09:00:00')
+    gone = add_event(user_id, 'Gone', '2030-03-04T09:00:00')
+    notes.discard_event(gone)
+
+    # Moving the exam re-indexes it, so only the reminder for the new time is current
+    notes.unindex_event(exam)
+    exam['start'] = '2030-03-05T09:00:00'
+    notes.index_event(exam)
+
+    assert fire_due('2030-03-04T23:59:59') == []
+    assert notes.stale_reminders == 0
+    assert fire_due('2030-03-05T08:45:00') == [(exam['id'], None)]
+
+
+def test_recurring_event_queues_its_next_occurrence(user_id):
+    event = add_event(user_id, 'Standup', '2030-03-04T09:00:00', end='2030-03-04T09:15:00', reminder=10,
+                      recurrence=notes.normalize_recurrence({'frequency': 'daily'}))
+    notes.set_occurrence_exception(event, '2030-03-05', {'cancelled': True})
+    notes.set_occurrence_exception(event, '2030-03-07', {'start': '2030-03-06T17:00:00', 'end': '2030-03-06T17:15:00'})
+
+    assert queued() == [('2030-03-04T08:50:00', '2030-03-04')]
+    assert fire_due('2030-03-04T08:50:00') == [(event['id'], '2030-03-04')]
+    # The 5th is cancelled, so the 6th is next, then the 7th moved to the evening of the 6th
+    assert queued() == [('2030-03-06T08:50:00', '2030-03-06')]
+    assert fire_due('2030-03-06T08:50:00') == [(event['id'], '2030-03-06')]
+    assert queued() == [('2030-03-06T16:50:00', '2030-03-07')]
+    assert fire_due('2030-03-06T16:50:00') == [(event['id'], '2030-03-07')]
+    assert queued() == [('2030-03-08T08:50:00', '2030-03-08')]
+
+    notified = notes.notifications_store[user_id]
+    assert [n['event_id'] for n in notified] == [f"{event['id']}@{day}" for day in ('2030-03-04', '2030-03-06', '2030-03-07')]
+
+
+def test_notifications_limit_and_read(client, user_id):
+    for hour in range(10, 13):
+        add_event(user_id, f"Class {hour}", f"2030-03-04T{hour}:00:00")
+    fire_due('2030-03-04T12:00:00')
+
+    assert [n['title'] for n in client.get('/notes/api/notifications?limit=2').get_json()['notifications']] == ['Class 12', 'Class 11']
+    assert client.get('/notes/api/notifications?limit=lots').status_code == 400
+
+    first = notes.notifications_store[user_id][0]['id']
+    client.post('/notes/api/notifications/read', json={'ids': [first]})
+    assert client.get('/notes/api/notifications?unread=true').get_json()['unread'] == 2
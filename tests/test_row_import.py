@@ -0,0 +1,90 @@
+"""CSV and JSON-lines row import and streamed row export"""
+import io
+import json
+
+from app.blueprints import notes
+
+
+PROPERTIES = [
+    {'id': 'name', 'name': 'Name', 'type': 'text'},
+    {'id': 'pages', 'name': 'Pages', 'type': 'number'},
+    {'id': 'due', 'name': 'Due', 'type': 'date'},
+    {'id': 'done', 'name': 'Done', 'type': 'checkbox'},
+    {'id': 'status', 'name': 'Status', 'type': 'select', 'options': [{'id': 'todo', 'name': 'To do'}, {'id': 'done', 'name': 'Done'}]},
+    {'id': 'tags', 'name': 'Tags', 'type': 'multi_select', 'options': [{'id': 'math', 'name': 'Math'}, {'id': 'bio', 'name': 'Biology'}]}
+]
+
+
+def make_database(owner_id, name='Reading'):
+    db = {'id': f"db-{owner_id}-{name}", 'name': name, 'properties': [dict(prop) for prop in PROPERTIES]}
+    notes.databases_store[db['id']] = db
+    notes.add_to_partition('databases', db, owner_id)
+    return db
+
+
+def import_rows(client, db, filename, content, **form):
+    data = {'file': (io.BytesIO(content.encode('utf-8')), filename), **form}
+    return client.post(f"/notes/api/database/{db['id']}/import", data=data, content_type='multipart/form-data')
+
+
+def export_rows(client, db, format):
+    with client.get(f"/notes/api/database/{db['id']}/export/{format}") as response:
+        return response.status_code, response.get_data(as_text=True)
+
+
+def rows(db):
+    return [row['properties'] for row in notes.iter_database_rows(db)]
+
+
+def test_csv_import_coerces_types_and_reports_bad_lines(client, user_id):
+    db = make_database(user_id)
+    csv_text = ('Name,pages,Due,Done,Status,Tags,Notes\n'
+                'Algebra,12,2026-03-01,yes,To do,"Math, Biology",ignored\n'
+                'Cells,,2026-03-05T09:00:00,no,done,bio,\n'
+                '\n'
+                'Bad number,twelve,,,,,\n'
+                'Bad date,3,next week,,,,\n'
+                'Too,many,fields,,,,,,\n')
+    report = import_rows(client, db, 'reading.csv', csv_text).get_json()
+
+    assert report['imported'] == 2 and report['skipped_columns'] == ['Notes']
+    assert [error['line'] for error in report['errors']] == [5, 6, 7]
+    assert 'not a number' in report['errors'][0]['error'] and 'not a date' in report['errors'][1]['error']
+    assert rows(db) == [
+        {'name': 'Algebra', 'pages': 12, 'due': '2026-03-01', 'done': True, 'status': 'todo', 'tags': ['math', 'bio']},
+        {'name': 'Cells', 'due': '2026-03-05T09:00:00', 'done': False, 'status': 'done', 'tags': ['bio']}
+    ]
+
+
+def test_csv_export_writes_option_names(client, user_id):
+    db = make_database(user_id)
+    notes.append_table_rows(db, notes.get_row_table(db), [{'name': 'Algebra, part 1', 'pages': 2.5, 'status': 'todo', 'tags': ['math', 'bio']}])
+    status, text = export_rows(client, db, 'csv')
+    assert status == 200
+    assert text.splitlines() == ['Name,Pages,Due,Done,Status,Tags', '"Algebra, part 1",2.5,,,To do,"Math, Biology"']
+
+
+def test_jsonl_round_trip(client, user_id):
+    source = make_database(user_id, 'Source')
+    notes.append_table_rows(source, notes.get_row_table(source), [
+        {'name': 'Algebra', 'pages': 12, 'due': '2026-03-01', 'done': True, 'status': 'todo', 'tags': ['math']},
+        {'name': 'Cells', 'pages': 7.5, 'status': 'done', 'tags': ['bio', 'math']},
+        {'name': 'Empty'}
+    ])
+    status, text = export_rows(client, source, 'jsonl')
+    assert status == 200
+    assert [json.loads(line)['properties']['name'] for line in text.splitlines()] == ['Algebra', 'Cells', 'Empty']
+
+    copy = make_database(user_id, 'Copy')
+    report = import_rows(client, copy, 'rows.ndjson', text + '\nnot json\n[1, 2]\n{"pages": "lots"}\n').get_json()
+    assert report['imported'] == 3
+    assert [error['line'] for error in report['errors']] == [5, 6, 7]
+    assert rows(copy) == rows(source)
+
+
+def test_import_rejects_bad_requests(client, user_id):
+    db = make_database(user_id)
+    assert import_rows(client, db, 'rows.xlsx', 'x').status_code == 400
+    assert client.post(f"/notes/api/database/{db['id']}/import", data={}, content_type='multipart/form-data').status_code == 400
+    assert export_rows(client, db, 'xml')[0] == 400
+    assert import_rows(client, {'id': 'db-missing'}, 'rows.csv', 'Name\nx\n').status_code == 404
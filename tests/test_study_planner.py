@@ -0,0 +1,71 @@
+"""Earliest-deadline-first study planner"""
+from collections import defaultdict
+from datetime import datetime
+
+from app.blueprints import notes
+
+
+def add_assignments(client, cls, **due_dates):
+    assignments = [{'title': title, 'due_date': due} for title, due in due_dates.items()]
+    client.post(f"/notes/api/classes/{cls['id']}/assignments/bulk", json={'assignments': assignments})
+    return {assignment['title']: assignment['id'] for assignment in cls['assignments']}
+
+
+def plan(client, **data):
+    return client.post('/notes/api/study/plan', json=data)
+
+
+def minutes(block):
+    return (datetime.fromisoformat(block['end']) - datetime.fromisoformat(block['start'])).total_seconds() / 60
+
+
+def test_nearest_deadline_first_within_daily_caps(client, new_class, user_id):
+    ids = add_assignments(client, new_class(), Essay='2030-03-06T20:00', Quiz='2030-03-04T12:00')
+
+    result = plan(client, start='2030-03-04T08:00', dry_run=True,
+                  effort={ids['Essay']: 5, ids['Quiz']: 1}).get_json()
+    blocks = result['blocks']
+    assert result['unscheduled'] == []
+    assert [b['title'] for b in blocks[:2]] == ['Quiz', 'Quiz']
+    assert (blocks[0]['start'], blocks[0]['end']) == ('2030-03-04T08:00:00', '2030-03-04T08:50:00')
+    assert blocks[1]['end'] == '2030-03-04T09:10:00'
+
+    essay_per_day = defaultdict(float)
+    for block in blocks:
+        if block['title'] == 'Essay':
+            essay_per_day[block['start'][:10]] += minutes(block)
+    assert sum(essay_per_day.values()) == 300
+    assert max(essay_per_day.values()) <= notes.DEFAULT_STUDY_OPTIONS['max_assignment_minutes_per_day']
+    assert notes.query_events(event_type='study', owner_id=user_id) == []  # dry_run saves nothing
+
+
+def test_avoids_busy_time_and_reports_what_does_not_fit(client, new_class, user_id):
+    notes.store_event({'id': f"{user_id}-lab", 'title': 'Lab', 'start': '2030-03-04T08:00:00',
+                       'end': '2030-03-04T12:00:00'}, user_id)
+    ids = add_assignments(client, new_class(), Report='2030-03-04T14:00')
+
+    result = plan(client, start='2030-03-04T08:00', dry_run=True, effort={ids['Report']: 3}).get_json()
+    assert [(b['start'], b['end']) for b in result['blocks']] == [
+        ('2030-03-04T12:00:00', '2030-03-04T12:50:00'), ('2030-03-04T13:00:00', '2030-03-04T13:50:00')]
+    assert [(u['assignment_id'], u['minutes']) for u in result['unscheduled']] == [(ids['Report'], 80)]
+
+
+def test_replanning_replaces_saved_blocks(client, new_class, user_id):
+    ids = add_assignments(client, new_class(), Project='2030-03-08T20:00')
+    data = {'start': '2030-03-04T08:00', 'effort': {ids['Project']: 4}}
+
+    first = plan(client, **data).get_json()['blocks']
+    second = plan(client, **data).get_json()['blocks']
+    saved = notes.query_events(event_type='study', owner_id=user_id)
+    assert len(first) == len(second) == len(saved)
+    assert {event['id'] for event in saved} == {event['id'] for event in second}
+
+    assert client.delete('/notes/api/study/plan').get_json()['removed'] == len(saved)
+    assert notes.query_events(event_type='study', owner_id=user_id) == []
+
+
+def test_rejects_invalid_options(client, new_class):
+    add_assignments(client, new_class(), Essay='2030-03-06T20:00')
+    for data in ({'effort': [1]}, {'effort': 'lots'}, {'effort': {'a1': 'lots'}},
+                 {'block_minutes': 20, 'min_block_minutes': 30}, {'day_start': '8am'}):
+        assert plan(client, start='2030-03-04T08:00', **data).status_code == 400
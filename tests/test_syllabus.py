@@ -0,0 +1,156 @@
+"""Syllabus text extraction, line parsing and background parse jobs"""
+import io
+import time
+import zipfile
+from datetime import date
+
+import pytest
+
+from app.blueprints import notes
+
+
+SYLLABUS = """BIO 101 Fall 2025
+Instructor: Dr. Ada Lovelace
+Lectures MWF 10:00-10:50am
+
+Homework: 20%
+Exams: 50%
+A 90-100
+B 80-89
+
+HW 1 due Sep 12
+Midterm Exam Oct 14 (100 pts)
+No class Nov 27-28 (Thanksgiving)
+"""
+
+
+def wait_for(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/notes/api/syllabus/{job_id}").get_json()['job']
+        if job['finished_at']:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"syllabus job {job_id} did not finish")
+
+
+def docx_bytes(paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{text.replace(chr(9), "</w:t><w:tab/><w:t>")}</w:t></w:r></w:p>'
+                   for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+                         f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Due 2025-09-05', (date(2025, 9, 5), None, '2025-09-05', 2025)),
+    ('Quiz 1 on Sep 5', (date(2024, 9, 5), None, 'Sep 5', None)),
+    ('Paper due September 5th, 2026', (date(2026, 9, 5), None, 'September 5th, 2026', 2026)),
+    ('Break Nov 27-28', (date(2024, 11, 27), date(2024, 11, 28), 'Nov 27-28', None)),
+    ('Lab 9/5/25', (date(2025, 9, 5), None, '9/5/25', 2025)),
+    ('Scored 13/45, retake 9/12', (date(2024, 9, 12), None, '9/12', None)),
+    ('Scored 13/45', None),
+    ('Chapter 3 and 4', None)
+], ids=['iso', 'month-day', 'month-day-year', 'range', 'numeric', 'skips-invalid', 'invalid', 'no-date'])
+def test_parse_syllabus_dates(line, expected):
+    assert notes.parse_syllabus_dates(line, 2024) == expected
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('Lectures MWF 10:00-10:50am', (['monday', 'wednesday', 'friday'], '10:00', '10:50')),
+    ('TTh 11:30-12:45pm in Hall B', (['tuesday', 'thursday'], '11:30', '12:45')),
+    ('Tuesday and Thursday 2:00 pm - 3:15 pm', (['tuesday', 'thursday'], '14:00', '15:15')),
+    ('Office hours by appointment', None),
+    ('10:00-10:50am', None)
+], ids=['letters', 'noon', 'names', 'no-times', 'no-days'])
+def test_parse_meeting_schedule(line, expected):
+    schedule = notes.parse_meeting_schedule(line)
+    assert (schedule and (schedule['days'], schedule['start_time'], schedule['end_time'])) == expected
+
+
+def test_parse_syllabus_line_sorts_lines_into_the_result():
+    result = {'schedule': {}, 'assignments': [], 'events': [], 'policies': [], 'grading': {}}
+    cls = {'schedule': {}}
+    lines = ['Homework: 20%', 'Final Exam - 35 %', 'A- 90-93', 'B+ : 87% to 89%', 'Lectures MWF 10:00-10:50am',
+             'Late work loses 10% per day', 'Midterm Exam Oct 14, 2025 (80 pts)', 'Essay draft due Oct 20 5pm',
+             'No class Nov 27-28 (Thanksgiving)', 'Review session Dec 8 at 6pm']
+    year = 2024
+    for line in lines:
+        year = notes.parse_syllabus_line(line, year, cls, result)
+
+    assert year == 2025  # the explicit year carries over to later dates
+    assert result['grading'] == {'weights': {'Homework': '20%', 'Final Exam': '35%'},
+                                 'scale': {'A-': '90-93', 'B+': '87%to89%'}}
+    assert result['schedule'] == {'days': ['monday', 'wednesday', 'friday'], 'start_time': '10:00', 'end_time': '10:50'}
+    assert [p['type'] for p in result['policies']] == ['late_work']
+    assert [(a['title'], a['type'], a['due_date'], a['points']) for a in result['assignments']] == [
+        ('Midterm Exam', 'exam', '2025-10-14T10:00:00', 80),
+        ('Essay draft', 'paper', '2025-10-20T17:00:00', 100)]
+    assert [(e['title'], e['type'], e['start'], e['end']) for e in result['events']] == [
+        ('No class (Thanksgiving)', 'holiday', '2025-11-27', '2025-11-28'),
+        ('Review session', 'review', '2025-12-08T18:00:00', '2025-12-08T20:00:00')]
+
+
+def test_pdf_content_text():
+    content = rb'BT /F1 12 Tf (Syllabus) Tj 0 -14 Td [(Due ) -20 (Sep 5 \(HW\\1\)\051)] TJ T* (caf\351) Tj ET'
+    assert notes.pdf_content_text(content) == 'Syllabus\nDue Sep 5 (HW\\1))\ncafé\n'
+
+
+def test_iter_docx_text(tmp_path):
+    path = tmp_path / 'syllabus.docx'
+    path.write_bytes(docx_bytes(['Quiz 1\tSep 5', '', 'Lab 2 due 9/12']))
+    assert list(notes.iter_docx_text(str(path))) == ['Quiz 1\tSep 5\n', '\n', 'Lab 2 due 9/12\n']
+
+
+def test_syllabus_job_lifecycle(client, new_class, user_id):
+    cls = new_class(term='Fall 2025')
+    response = client.post(f"/notes/api/classes/{cls['id']}/syllabus", json={'text': SYLLABUS})
+    assert response.status_code == 202
+    job = wait_for(client, response.get_json()['job_id'])
+
+    assert job['status'] == 'completed' and job['error'] is None
+    assert (job['assignments_added'], job['events_added']) == (2, 1)
+    assert cls['syllabus_parsed'] and cls['grading']['weights'] == {'Homework': '20%', 'Exams': '50%'}
+    assert cls['schedule']['days'] == ['monday', 'wednesday', 'friday']
+    assert sorted((a['title'], a['due_date']) for a in cls['assignments']) == [
+        ('HW 1', '2025-09-12T23:59:00'), ('Midterm Exam', '2025-10-14T10:00:00')]
+    assert [e['title'] for e in notes.query_events(class_id=cls['id'], event_type='holiday', owner_id=user_id)] == [
+        'BIO 101: No class (Thanksgiving)']
+
+    # Uploading the same syllabus again changes nothing
+    job = wait_for(client, client.post(f"/notes/api/classes/{cls['id']}/syllabus", json={'text': SYLLABUS}).get_json()['job_id'])
+    assert (job['assignments_added'], job['assignments_updated'], job['events_added']) == (0, 0, 0)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = f"{user_id}-other"
+    assert client.get(f"/notes/api/syllabus/{job['id']}").status_code == 404
+
+
+def test_docx_upload(client, new_class):
+    cls = new_class(term='Spring 2026')
+    data = {'file': (io.BytesIO(docx_bytes(['Quiz 1 Feb 3', 'Lab 2 due 2/10'])), 'syllabus.docx')}
+    response = client.post(f"/notes/api/classes/{cls['id']}/syllabus", data=data, content_type='multipart/form-data')
+    job = wait_for(client, response.get_json()['job_id'])
+    assert job['status'] == 'completed'
+    assert sorted((a['type'], a['due_date'][:10]) for a in cls['assignments']) == [('lab', '2026-02-10'), ('quiz', '2026-02-03')]
+
+
+def test_rejects_bad_uploads(client, new_class):
+    cls = new_class()
+    for body in ({}, {'text': '  '}, {'text': 42}, {'text': ['HW 1 due Sep 12']}):
+        assert client.post(f"/notes/api/classes/{cls['id']}/syllabus", json=body).status_code == 400
+    data = {'file': (io.BytesIO(b'x'), 'syllabus.exe')}
+    assert client.post(f"/notes/api/classes/{cls['id']}/syllabus", data=data, content_type='multipart/form-data').status_code == 400
+    assert client.post('/notes/api/classes/missing/syllabus', json={'text': 'HW 1 due Sep 12'}).status_code == 404
+
+
+def test_job_fails_when_the_class_was_deleted(new_class, user_id):
+    cls = new_class()
+    job = {'id': 'syllabus-gone', 'class_id': cls['id'], 'filename': 'syllabus.txt', 'status': 'queued',
+           'stage': None, 'chunks_done': 0, 'error': None, 'finished_at': None}
+    del notes.classes_store[cls['id']]
+    notes.run_syllabus_job(job, None, 'HW 1 due Sep 12')
+    assert (job['status'], job['error']) == ('failed', 'Class was deleted')
+    assert job['finished_at']
@@ -0,0 +1,72 @@
+"""Trash index: deleted_at ordering, pagination, restore and purge"""
+from datetime import datetime, timedelta
+
+from app.blueprints import notes
+
+
+def make_pages(owner_id, count, prefix):
+    pages = []
+    for i in range(count):
+        page = {'id': f"{prefix}-{i}", 'title': f"Page {i}", 'blocks': []}
+        notes.pages_store[page['id']] = page
+        pages.append(notes.add_to_partition('pages', page, owner_id))
+    return pages
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).isoformat()
+
+
+def test_trash_is_paginated_newest_first(client, user_id):
+    pages = make_pages(user_id, 5, 'trash-page')
+    for i, page in enumerate(pages):
+        notes.move_pages_to_trash([page], days_ago(5 - i))
+
+    first = client.get('/notes/api/trash?limit=2').get_json()
+    assert [p['id'] for p in first['pages']] == ['trash-page-4', 'trash-page-3']
+    assert first['total'] == 5 and first['has_more']
+
+    last = client.get('/notes/api/trash?offset=4&limit=2').get_json()
+    assert [p['id'] for p in last['pages']] == ['trash-page-0']
+    assert not last['has_more']
+
+
+def test_restore_unlinks_the_trash_entry(client, user_id):
+    pages = make_pages(user_id, 3, 'restore-page')
+    notes.move_pages_to_trash(pages, days_ago(1))
+
+    assert client.post('/notes/api/page/restore-page-1/restore').status_code == 200
+    assert [pid for _, pid in notes.trash_store[user_id]] == ['restore-page-0', 'restore-page-2']
+    assert 'restore-page-1' in notes.get_partition('pages', user_id)
+    assert not pages[1]['is_deleted']
+
+
+def test_purge_removes_only_the_expired_prefix(user_id):
+    old, recent = make_pages(user_id, 2, 'purge-page')
+    notes.move_pages_to_trash([recent], days_ago(1))
+    notes.move_pages_to_trash([old], days_ago(10))
+
+    notes.purge_expired_trash(now=datetime.now() + timedelta(days=notes.TRASH_RETENTION_DAYS - 5))
+
+    assert 'purge-page-0' not in notes.pages_store
+    assert [pid for _, pid in notes.trash_store[user_id]] == ['purge-page-1']
+
+
+def test_expired_pages_are_purged_on_request(client, user_id):
+    expired, kept = make_pages(user_id, 2, 'lazy-page')
+    notes.move_pages_to_trash([kept], days_ago(1))
+    # An entry that expired since the owner's last trash request
+    expired.update(is_deleted=True, deleted_at=days_ago(notes.TRASH_RETENTION_DAYS + 1))
+    notes.remove_from_partition('pages', expired)
+    notes.add_to_partition('trash', expired)
+    notes.trash_store[user_id].insert(0, (expired['deleted_at'], expired['id']))
+
+    listing = client.get('/notes/api/trash').get_json()
+    assert [p['id'] for p in listing['pages']] == ['lazy-page-1']
+    assert 'lazy-page-0' not in notes.pages_store
+    assert client.post('/notes/api/page/lazy-page-0/restore').status_code == 404
+
+
+def test_invalid_pagination(client):
+    assert client.get('/notes/api/trash?offset=abc').status_code == 400
+    assert client.get('/notes/api/trash?limit=').status_code == 400